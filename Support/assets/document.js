@@ -3,7 +3,9 @@
 'use strict';
 
 document.addEventListener('DOMContentLoaded', function() {
-  var VERSION = '3.0.2';
+  // the report embeds the installed version; fall back for older templates
+  var versionEl = document.querySelector('.version-number');
+  var VERSION = (versionEl && versionEl.textContent.trim()) || '3.0.2';
 
 	// parse a version number into semver parts
   var parseVersion = function(ver) {
@@ -43,20 +45,140 @@ document.addEventListener('DOMContentLoaded', function() {
   // By default, links will open in the TextMate results window. If
   // the <a> tag has class "open-external" we’ll catch it and open
   // the link in the user’s browser instead.
+  var externalLinkHandler = function(e) {
+    e.preventDefault();
+    var href = e.currentTarget.href;
+    if (!href.match(/^http(?:s?)\:\/\/[^\/]/)) {
+      // doesn’t look like a normal URL
+      return;
+    }
+    TextMate.system('open "' + encodeURI(href) + '"', null);
+  };
+
   var handleExternalLinks = function() {
-    var handler = function(e) {
-      e.preventDefault();
-      var href = e.currentTarget.href;
-      if (!href.match(/^http(?:s?)\:\/\/[^\/]/)) {
-        // doesn’t look like a normal URL
-        return;
-      }
-      TextMate.system('open "' + encodeURI(href) + '"', null);
+    var els = document.getElementsByClassName('open-external');
+    Array.prototype.slice.call(els).forEach(function(el) {
+      el.addEventListener('click', externalLinkHandler);
+    });
+  };
+
+  // build a list item for an issue, matching the markup in report.html
+  var makeIssueItem = function(issue) {
+    var li = document.createElement('li');
+    li.className = 'list-group-item';
+    li.setAttribute('data-key', issue.key);
+    li.setAttribute('data-line', issue.line);
+    li.setAttribute('data-character', issue.character);
+
+    var symbol = document.createElement('span');
+    symbol.className = 'symbol';
+    symbol.textContent = issue.isError ? '\u274C' : '\u26A0';
+    li.appendChild(symbol);
+
+    var link = document.createElement('a');
+    link.href = issue.url;
+    link.textContent = 'at line ' + issue.line + ' position ' + issue.character + ':';
+    li.appendChild(link);
+    li.appendChild(document.createTextNode('\u00A0'));
+
+    var tt = document.createElement('tt');
+    tt.className = 'report';
+    tt.appendChild(document.createTextNode(issue.reason));
+    if (issue.shortname) {
+      var rule = document.createElement('a');
+      rule.href = 'http://eslint.org/docs/rules/' + encodeURIComponent(issue.shortname) + '.html';
+      rule.className = 'open-external';
+      rule.textContent = issue.shortname;
+      rule.addEventListener('click', externalLinkHandler);
+      tt.appendChild(document.createTextNode(' ('));
+      tt.appendChild(rule);
+      tt.appendChild(document.createTextNode(')'));
+    }
+    li.appendChild(tt);
+
+    return li;
+  };
+
+  // rebuild the error/warning count labels in the report heading
+  var updateCounts = function(data) {
+    var counts = document.querySelector('.issue-counts');
+    while (counts.firstChild) { counts.removeChild(counts.firstChild); }
+
+    var addLabel = function(className, text) {
+      var label = document.createElement('span');
+      label.className = 'label ' + className;
+      label.textContent = text;
+      counts.appendChild(label);
+      counts.appendChild(document.createTextNode(' '));
     };
 
-    var els = document.getElementsByClassName('open-external');
+    if (data.errorCountString) { addLabel('label-danger', data.errorCountString); }
+    if (data.warningCountString) { addLabel('label-warning', data.warningCountString); }
+    if (!data.errorCountString && !data.warningCountString) {
+      addLabel('label-success', 'No errors or warnings');
+    }
+
+    var panel = document.querySelector('.report-panel');
+    panel.classList.toggle('panel-default', data.hasErrorsOrWarnings);
+    panel.classList.toggle('panel-success', !data.hasErrorsOrWarnings);
+  };
+
+  // apply the added and removed issues from a JSON refresh to the list
+  var patchIssues = function(data) {
+    var list = document.querySelector('.issue-list');
+
+    data.removed.forEach(function(key) {
+      var el = list.querySelector('li[data-key="' + key + '"]');
+      if (el) { list.removeChild(el); }
+    });
+
+    var position = function(el) {
+      return [
+        parseInt(el.getAttribute('data-line'), 10),
+        parseInt(el.getAttribute('data-character'), 10)
+      ];
+    };
+
+    data.added.forEach(function(issue) {
+      var item = makeIssueItem(issue);
+      var items = Array.prototype.slice.call(list.children);
+      var before = items.filter(function(el) {
+        var pos = position(el);
+        return pos[0] > issue.line ||
+          (pos[0] === issue.line && pos[1] > issue.character);
+      })[0];
+      list.insertBefore(item, before || null);
+    });
+
+    updateCounts(data);
+  };
+
+  // re-validate the saved file and patch the report in place
+  var handleRefresh = function() {
+    var els = document.getElementsByClassName('refresh-report');
     Array.prototype.slice.call(els).forEach(function(el) {
-      el.addEventListener('click', handler);
+      el.addEventListener('click', function(e) {
+        e.preventDefault();
+        var errorEl = document.querySelector('.refresh-error');
+        errorEl.classList.add('hidden');
+
+        TextMate.system(el.getAttribute('data-command'), function(task) {
+          var data;
+          try {
+            data = JSON.parse(task.outputString);
+          } catch (err) {
+            data = { error: task.errorString || 'Refresh failed' };
+          }
+
+          if (data.error) {
+            errorEl.textContent = data.error;
+            errorEl.classList.remove('hidden');
+            return;
+          }
+
+          patchIssues(data);
+        });
+      });
     });
   };
 
@@ -98,13 +220,15 @@ document.addEventListener('DOMContentLoaded', function() {
   };
 
   var showVersion = function() {
-    var el = document.querySelector('.version-number');
-    if (el) { el.textContent = VERSION; }
+    if (versionEl && !versionEl.textContent.trim()) {
+      versionEl.textContent = VERSION;
+    }
   };
 
   // self init
   handleEscape();
   handleExternalLinks();
+  handleRefresh();
   handleUpdateChecker();
   showVersion();
 });
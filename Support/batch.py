@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Validate many files at once, with several ESLint processes running
+side by side.
+"""
+
+import os
+import validator
+import scheduling
+
+JS_EXTENSIONS = ('.js', '.jsx', '.mjs')
+HTML_EXTENSIONS = ('.html', '.htm')
+# directories that never contain code we want to validate
+SKIP_DIRS = ('node_modules', 'bower_components')
+
+def is_html(path):
+    """ Should this file be validated as HTML with embedded scripts? """
+    return path is not None and path.lower().endswith(HTML_EXTENSIONS)
+
+def is_validatable(path):
+    """ Is this a JavaScript or HTML file? """
+    return path.lower().endswith(JS_EXTENSIONS + HTML_EXTENSIONS)
+
+def expand_paths(paths):
+    """
+    Expand a list of files and directories into a sorted list of the
+    JavaScript and HTML files they contain. Files named explicitly are
+    always included; hidden directories and SKIP_DIRS are not searched.
+    """
+    found = set()
+
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isfile(path):
+            found.add(path)
+            continue
+
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = [
+                d for d in dirnames
+                if not d.startswith('.') and d not in SKIP_DIRS
+            ]
+            for filename in filenames:
+                if is_validatable(filename):
+                    found.add(os.path.join(dirpath, filename))
+
+    return sorted(found)
+
+def largest_first(paths):
+    """ Order paths by file size, largest first, so they finish early. """
+    def size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    return sorted(paths, key=size, reverse=True)
+
+def validate_files(paths, eslint_command='eslint', cwd=None, processes=None):
+    """
+    Validate files, running several ESLint processes at a time at
+    background priority: by default as many as idle CPUs and free
+    memory allow. Returns a list of (path, issues, error_message)
+    tuples sorted by path.
+    """
+    the_validator = validator.Validator(eslint_command, background=True)
+
+    def starter(path):
+        """ Return a function that starts validating path. """
+        def start():
+            """ Start validating path. """
+            with open(path, 'r') as infile:
+                return the_validator.start(
+                    input_iterable=infile,
+                    filename=path,
+                    input_is_html=is_html(path),
+                    cwd=cwd
+                )
+        return start
+
+    # ignored files are left out by Validator.start without running ESLint
+    paths = largest_first(paths)
+    starts = [(path, starter(path)) for path in paths]
+    concurrency = processes or scheduling.max_workers(len(paths))
+
+    results = list(validator.run_many(starts, concurrency))
+    return sorted(results, key=lambda result: result[0])
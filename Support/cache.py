@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Locate the bundle’s cache directory and read/write small cache files.
+"""
+
+import os
+import sys
+import json
+
+def cache_dir(*parts):
+    """
+    Return (and create if needed) a directory inside the bundle’s
+    cache directory.
+
+    The location can be overridden with TM_JAVASCRIPT_ESLINT_CACHE_DIR.
+    """
+    base = os.environ.get('TM_JAVASCRIPT_ESLINT_CACHE_DIR', None)
+    if not base:
+        if sys.platform == 'darwin':
+            base = os.path.expanduser('~/Library/Caches')
+        else:
+            base = os.environ.get('XDG_CACHE_HOME', None) or \
+                os.path.expanduser('~/.cache')
+        base = os.path.join(base, 'javascript-eslint.tmbundle')
+
+    path = os.path.join(base, *parts)
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            # another process may have created it first
+            if not os.path.isdir(path):
+                raise
+    return path
+
+def load_json(path, default=None):
+    """ Load a JSON cache file, returning default if it is missing or bad. """
+    try:
+        with open(path, 'r') as infile:
+            return json.load(infile)
+    except (IOError, OSError, ValueError):
+        return default
+
+def save_json(path, data):
+    """
+    Atomically write a JSON cache file. Failures are ignored: a cache
+    that cannot be written is simply a cache miss next time.
+    """
+    save_text(path, json.dumps(data))
+
+def load_text(path, default=None):
+    """ Load a UTF-8 text cache file, returning default if it is missing. """
+    try:
+        with open(path, 'rb') as infile:
+            return infile.read().decode('utf-8')
+    except (IOError, OSError, UnicodeDecodeError):
+        return default
+
+def save_text(path, text):
+    """ Atomically write a text cache file as UTF-8, ignoring failures. """
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    import tempfile
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as outfile:
+            outfile.write(text)
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        pass
+
+def key_for(text):
+    """ Return a short hex digest suitable for use as a cache key. """
+    import hashlib
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Validate files with ESLint outside of TextMate, printing each issue as
+a line of JSON as soon as it is found.
+
+    python cli.py [--eslint CMD] [--cwd DIR] [--stdin-filename NAME] [PATH ...]
+
+With no paths (or a path of -) the code to validate is read from stdin.
+Directories are searched for JavaScript and HTML files. Files ending in
+.html or .htm are validated using only the content of their <script>
+tags.
+
+Exit status: 0 if there were no issues, 1 if there were only warnings,
+2 if there were errors, 3 if ESLint could not be run.
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import argparse
+import batch
+import validator
+
+EXIT_CLEAN = 0
+EXIT_WARNINGS = 1
+EXIT_ERRORS = 2
+EXIT_FAILURE = 3
+
+def emit(record):
+    """ Write one NDJSON record and flush it right away. """
+    sys.stdout.write(json.dumps(record, sort_keys=True) + '\n')
+    sys.stdout.flush()
+
+def validate(the_validator, input_iterable, filename, cwd):
+    """
+    Validate one input, emitting its issues. Returns the exit status for
+    this input.
+    """
+    status = EXIT_CLEAN
+    issues = the_validator.iter_run(
+        input_iterable=input_iterable,
+        filename=filename,
+        input_is_html=batch.is_html(filename),
+        cwd=cwd
+    )
+
+    try:
+        for issue in issues:
+            del issue['url']
+            issue['file'] = filename
+            emit(issue)
+            if issue['isError']:
+                status = EXIT_ERRORS
+            elif issue['isWarning']:
+                status = max(status, EXIT_WARNINGS)
+    except validator.ValidateError as err:
+        print('{0}: {1}'.format(filename or '<stdin>', err.message), file=sys.stderr)
+        return EXIT_FAILURE
+
+    return status
+
+def main(argv=None):
+    """ Validate the files named on the command line. """
+    parser = argparse.ArgumentParser(
+        description='Validate JavaScript with ESLint, printing issues as NDJSON.')
+    parser.add_argument('paths', nargs='*', metavar='PATH',
+                        help='files or directories to validate; - or nothing reads stdin')
+    parser.add_argument('--eslint', default=os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint'),
+                        help='the eslint command to run')
+    parser.add_argument('--cwd', default=os.getcwd(),
+                        help='directory ESLint runs in, used to find its config')
+    parser.add_argument('--stdin-filename',
+                        help='filename to report for code read from stdin')
+    args = parser.parse_args(argv)
+
+    the_validator = validator.Validator(args.eslint)
+    try:
+        return validate_paths(the_validator, args)
+    except Exception:   # pylint: disable=broad-except
+        # a crash must not look like “warnings only” to a pre-commit hook
+        import traceback
+        traceback.print_exc()
+        return EXIT_FAILURE
+
+def validate_paths(the_validator, args):
+    """ Validate each path in args. Returns the exit status. """
+    status = EXIT_CLEAN
+
+    for path in args.paths or ['-']:
+        if path == '-':
+            filename = args.stdin_filename and os.path.abspath(args.stdin_filename)
+            result = validate(the_validator, sys.stdin, filename, args.cwd)
+            status = max(status, result)
+            continue
+
+        if not os.path.exists(path):
+            print('{0}: No such file or directory'.format(path), file=sys.stderr)
+            status = EXIT_FAILURE
+            continue
+
+        for filename in batch.expand_paths([path]):
+            try:
+                with open(filename, 'r') as infile:
+                    result = validate(the_validator, infile, filename, args.cwd)
+            except IOError as err:
+                print('{0}: {1}'.format(filename, err.strerror), file=sys.stderr)
+                result = EXIT_FAILURE
+            status = max(status, result)
+
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Run a bundle command through the resident server (server.py) if one is
+running, otherwise run it in this process.
+
+Takes the same arguments as main.py. Set TM_JAVASCRIPT_ESLINT_SERVER=1
+to start the server automatically for subsequent commands.
+"""
+
+import os
+import sys
+import json
+import errno
+import socket
+import cache
+
+class ServerGone(Exception):
+    """
+    Report that the server’s socket is still there but nothing is
+    listening on it: the server was killed, or the machine restarted.
+    """
+    pass
+
+def read_stdin():
+    """ Read all of stdin as bytes. """
+    return getattr(sys.stdin, 'buffer', sys.stdin).read()
+
+def write_stdout(data):
+    """ Write bytes to stdout. """
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    out.write(data)
+    out.flush()
+
+def run_remote(socket_path, argv, stdin_data):
+    """
+    Send the command to the server. Returns (status, output, error) or
+    None if the server is not available, or raises ServerGone. error is
+    the traceback of a command that crashed, or empty.
+    """
+    request = json.dumps({
+        'argv': argv,
+        'env': dict(os.environ),
+        'cwd': os.getcwd()
+    }).encode('utf-8') + b'\n'
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+        except socket.error as err:
+            if err.errno in (errno.ECONNREFUSED, errno.ENOENT):
+                raise ServerGone()
+            raise
+        sock.sendall(request + stdin_data)
+        sock.shutdown(socket.SHUT_WR)
+
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except socket.error:
+        return None
+    finally:
+        sock.close()
+
+    response = b''.join(chunks)
+    if b'\n' not in response:
+        # the server refused the request (it is shutting down)
+        return None
+    header, output = response.split(b'\n', 1)
+    header = json.loads(header.decode('utf-8'))
+    return header['status'], output, header.get('error', '')
+
+def run_local(argv, stdin_data):
+    """ Run the command in this process. """
+    try:
+        from StringIO import StringIO
+    except ImportError:
+        from io import StringIO
+        stdin_data = stdin_data.decode('utf-8')
+
+    sys.stdin = StringIO(stdin_data)
+    import main
+    main.main(argv)
+
+def start_server():
+    """ Start the resident server in the background. """
+    import server
+    server.start()
+
+def run(argv):
+    """ Run a bundle command, remotely if possible. """
+    stdin_data = read_stdin()
+    socket_path = os.path.join(cache.cache_dir(), 'server.sock')
+    auto_start = os.environ.get('TM_JAVASCRIPT_ESLINT_SERVER') == '1'
+
+    if os.path.exists(socket_path):
+        try:
+            result = run_remote(socket_path, argv, stdin_data)
+        except ServerGone:
+            # clear the stale socket so the next command gets a server
+            try:
+                os.remove(socket_path)
+            except OSError:
+                pass
+            result = None
+            if auto_start:
+                start_server()
+        if result is not None:
+            status, output, error = result
+            write_stdout(output)
+            if error:
+                sys.stderr.write(error)
+            sys.exit(status)
+    elif auto_start:
+        start_server()
+
+    run_local(argv, stdin_data)
+
+
+if __name__ == '__main__':
+    run(sys.argv)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Manage a V8 compile cache for the ESLint processes we start, so that
+Node does not have to parse and compile ESLint and its plugins from
+scratch every time.
+
+Node (22.1 and later) uses the directory named by NODE_COMPILE_CACHE.
+There is one directory per ESLint version, so projects on different
+versions each keep theirs. When they grow too large together, the
+least recently used are deleted. Set TM_JAVASCRIPT_ESLINT_COMPILE_CACHE
+to 0 to turn it off.
+"""
+
+import os
+import json
+import time
+import shutil
+import cache
+
+# for the caches of all ESLint versions together
+MAX_BYTES = 128 * 1024 * 1024
+# how often to check the size of the caches
+CHECK_INTERVAL = 60 * 60
+STAMP_FILE = '.checked'
+# touched whenever a version’s cache is used
+USED_FILE = '.used'
+# a cache used this recently may still be in use, so is never deleted
+MIN_IDLE = 10 * 60
+# caches of versions unused for this long are deleted
+MAX_AGE = 30 * 24 * 60 * 60
+# directories already prepared in this process, keyed by ESLint path
+_DIRS = {}
+
+def is_enabled():
+    """ Has the compile cache been turned off? """
+    return os.environ.get('TM_JAVASCRIPT_ESLINT_COMPILE_CACHE', '1') != '0'
+
+def eslint_version(eslint_path):
+    """
+    Return the version of the ESLint package an executable belongs to,
+    or a key based on the executable if the package can’t be found.
+    """
+    real_path = os.path.realpath(eslint_path)
+    dirname = os.path.dirname(real_path)
+    for _ in range(3):
+        try:
+            with open(os.path.join(dirname, 'package.json'), 'r') as infile:
+                package = json.load(infile)
+            if package.get('name') == 'eslint' and package.get('version'):
+                return package['version']
+        except (IOError, ValueError):
+            pass
+        dirname = os.path.dirname(dirname)
+
+    try:
+        mtime = os.stat(real_path).st_mtime
+    except OSError:
+        mtime = 0
+    return cache.key_for('%s:%s' % (real_path, mtime))
+
+def directory_size(path):
+    """ The total size of the files below path, in bytes. """
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+def last_used(directory):
+    """ When a version directory was last used, as a timestamp. """
+    for path in (os.path.join(directory, USED_FILE), directory):
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            pass
+    return 0
+
+def mark_used(directory):
+    """ Record that a version directory is being used now. """
+    used = os.path.join(directory, USED_FILE)
+    try:
+        os.utime(used, None)
+    except OSError:
+        cache.save_text(used, '')
+
+def empty(directory):
+    """ Delete the cached code in directory, keeping our own records. """
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif name != USED_FILE:
+            os.remove(path)
+
+def prune(root, current, max_bytes=MAX_BYTES):
+    """
+    Keep the caches in root under max_bytes in all. Version directories
+    unused for MAX_AGE go first, then the least recently used, until the
+    rest fit. A directory used in the last MIN_IDLE seconds may belong
+    to an ESLint that is still running, so it is left alone; the current
+    one is emptied only if it is too big on its own.
+    """
+    now = time.time()
+    others = sorted(
+        (last_used(os.path.join(root, name)), os.path.join(root, name))
+        for name in os.listdir(root)
+        if os.path.isdir(os.path.join(root, name)) and
+        os.path.join(root, name) != current
+    )
+    sizes = dict((path, directory_size(path)) for _, path in others)
+    total = sum(sizes.values()) + directory_size(current)
+
+    for used, path in others:
+        if now - used < MIN_IDLE:
+            break
+        if total > max_bytes or now - used > MAX_AGE:
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+
+    if directory_size(current) > max_bytes:
+        empty(current)
+
+def check(root, current):
+    """ Run prune() once every CHECK_INTERVAL seconds. """
+    stamp = os.path.join(root, STAMP_FILE)
+    try:
+        if time.time() - os.stat(stamp).st_mtime < CHECK_INTERVAL:
+            return
+    except OSError:
+        pass
+    prune(root, current)
+    cache.save_text(stamp, '')
+
+def get_directory(eslint_path):
+    """ Return the compile cache directory for an ESLint executable. """
+    if eslint_path not in _DIRS:
+        directory = cache.cache_dir('compile-cache', eslint_version(eslint_path))
+        mark_used(directory)
+        check(cache.cache_dir('compile-cache'), directory)
+        _DIRS[eslint_path] = directory
+    return _DIRS[eslint_path]
+
+def apply(env, eslint_path):
+    """
+    Point NODE_COMPILE_CACHE in env at the cache for an ESLint
+    executable. Does nothing if the cache is turned off or the user has
+    set NODE_COMPILE_CACHE themselves.
+    """
+    if not is_enabled() or 'NODE_COMPILE_CACHE' in env or \
+            not os.path.isabs(eslint_path):
+        return
+    try:
+        env['NODE_COMPILE_CACHE'] = get_directory(eslint_path)
+    except OSError:
+        # the cache is a speed-up; never fail validation over it
+        pass
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Work out which ESLint config files and plugins apply to a file, so
+that cached results can be invalidated only for the directory subtree
+below a config file that changed.
+"""
+
+import os
+import re
+import cache
+
+# flat config files: ESLint uses the nearest one and looks no further
+FLAT_CONFIG_FILES = (
+    'eslint.config.js',
+    'eslint.config.mjs',
+    'eslint.config.cjs',
+    'eslint.config.ts',
+    'eslint.config.mts',
+    'eslint.config.cts'
+)
+# files that change what ESLint reports for the files below them
+CONFIG_FILES = (
+    '.eslintrc',
+    '.eslintrc.js',
+    '.eslintrc.cjs',
+    '.eslintrc.json',
+    '.eslintrc.yaml',
+    '.eslintrc.yml',
+    '.eslintignore',
+    'package.json'
+) + FLAT_CONFIG_FILES
+# installed packages whose version changes what ESLint reports
+PACKAGE_PREFIXES = ('eslint-plugin-', 'eslint-config-')
+# the same, for the part of a scoped package’s name after the scope
+SCOPED_NAMES = ('eslint-plugin', 'eslint-config')
+# “root: true” in an .eslintrc file, which ends the search for configs
+ROOT_RE = re.compile(r'\broot["\']?\s*:\s*true\b')
+
+def is_config_file(path):
+    """ Does a change to this file affect ESLint results? """
+    return os.path.basename(path) in CONFIG_FILES
+
+def is_eslint_package(name):
+    """
+    Is this node_modules entry ESLint or a plugin or shared config?
+    A scoped name (@scope/name) counts if the scope belongs to ESLint
+    or a plugin (@eslint, @typescript-eslint) or the name is a plugin or
+    shared config name (@scope/eslint-plugin, @scope/eslint-config-foo).
+    """
+    if name.startswith('@'):
+        scope, _, package = name.partition('/')
+        return 'eslint' in scope or package in SCOPED_NAMES or \
+            package.startswith(PACKAGE_PREFIXES)
+    return name == 'eslint' or name.startswith(PACKAGE_PREFIXES)
+
+def package_of(dirname):
+    """
+    If dirname is an installed package (node_modules/name or
+    node_modules/@scope/name), return (the node_modules path, the package
+    name); otherwise (None, None).
+    """
+    parent, package = os.path.split(dirname)
+    if os.path.basename(parent).startswith('@'):
+        parent, scope = os.path.split(parent)
+        package = scope + '/' + package
+    if os.path.basename(parent) == 'node_modules':
+        return parent, package
+    return None, None
+
+def affected_dir(path):
+    """
+    Return the directory whose subtree is affected by a change to path,
+    or None if path does not affect ESLint results.
+    """
+    path = os.path.abspath(path)
+    dirname, name = os.path.split(path)
+    if name in CONFIG_FILES:
+        # node_modules/eslint-plugin-foo/package.json affects everything
+        # below the directory that contains node_modules
+        modules, package = package_of(dirname)
+        if modules:
+            return os.path.dirname(modules) if is_eslint_package(package) else None
+        return dirname
+    return None
+
+def is_within(path, directory):
+    """ Is path inside directory (or the directory itself)? """
+    path = os.path.abspath(path)
+    directory = os.path.abspath(directory)
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+def is_root_config(path):
+    """ Does ESLint stop looking for configs at the file at path? """
+    name = os.path.basename(path)
+    if name in FLAT_CONFIG_FILES:
+        return True
+    if name == '.eslintignore':
+        return False
+    try:
+        with open(path, 'r') as infile:
+            text = infile.read()
+    except IOError:
+        return False
+    if name == 'package.json':
+        import json
+        try:
+            config = json.loads(text).get('eslintConfig')
+        except (ValueError, AttributeError):
+            return False
+        return isinstance(config, dict) and config.get('root') is True
+    return ROOT_RE.search(text) is not None
+
+class ConfigDependencies(object):
+    """
+    The config files and ESLint packages that apply to files, found by
+    walking up from each file’s directory as ESLint does: config files
+    up to the nearest flat config or config with “root: true” (or the
+    filesystem root), and installed packages all the way up, as Node
+    finds them. Results are memoized per directory.
+    """
+
+    def __init__(self, eslint_command='eslint'):
+        """
+        eslint_command -- the eslint command, included in fingerprints
+        """
+        self.eslint_command = eslint_command
+        self._dir_configs = {}
+        self._dir_packages = {}
+        self._dir_fingerprints = {}
+
+    def dependencies(self, path):
+        """
+        Return a list of (path, size, mtime) for every config file and
+        ESLint package.json that applies to the file at path.
+        """
+        dirname = os.path.dirname(os.path.abspath(path))
+        return self._configs_for_dir(dirname) + self._packages_for_dir(dirname)
+
+    def fingerprint(self, path):
+        """ Return a hash of the dependencies of the file at path. """
+        dirname = os.path.dirname(os.path.abspath(path))
+        if dirname not in self._dir_fingerprints:
+            parts = ['%s:%s:%s' % dep for dep in self.dependencies(path)]
+            parts.append(self.eslint_command)
+            self._dir_fingerprints[dirname] = cache.key_for('\n'.join(parts))
+        return self._dir_fingerprints[dirname]
+
+    def package_fingerprint(self, path):
+        """
+        Return a hash of the ESLint packages Node finds for the file at
+        path: the code a warm worker has loaded and can’t reload.
+        """
+        dirname = os.path.dirname(os.path.abspath(path))
+        parts = ['%s:%s:%s' % dep for dep in self._packages_for_dir(dirname)]
+        return cache.key_for('\n'.join(parts))
+
+    def _configs_for_dir(self, dirname):
+        """ The config files that apply in one directory, memoized. """
+        if dirname not in self._dir_configs:
+            found = []
+            for name in CONFIG_FILES:
+                found.extend(self._stat(os.path.join(dirname, name)))
+
+            parent = os.path.dirname(dirname)
+            if parent != dirname and \
+                    not any(is_root_config(config[0]) for config in found):
+                found.extend(self._configs_for_dir(parent))
+
+            self._dir_configs[dirname] = found
+        return self._dir_configs[dirname]
+
+    def _packages_for_dir(self, dirname):
+        """ The ESLint packages Node finds from one directory, memoized. """
+        if dirname not in self._dir_packages:
+            found = self._packages(dirname)
+            parent = os.path.dirname(dirname)
+            if parent != dirname:
+                found = found + self._packages_for_dir(parent)
+            self._dir_packages[dirname] = found
+        return self._dir_packages[dirname]
+
+    def _packages(self, dirname):
+        """ The package.json of each ESLint package in dirname/node_modules. """
+        modules = os.path.join(dirname, 'node_modules')
+        try:
+            names = os.listdir(modules)
+        except OSError:
+            return []
+        found = []
+        for name in sorted(names):
+            packages = [name]
+            if name.startswith('@'):
+                try:
+                    packages = [
+                        name + '/' + package
+                        for package in sorted(os.listdir(os.path.join(modules, name)))
+                    ]
+                except OSError:
+                    continue
+            for package in packages:
+                if is_eslint_package(package):
+                    found.extend(self._stat(os.path.join(modules, package, 'package.json')))
+        return found
+
+    @classmethod
+    def _stat(cls, path):
+        """ Return [(path, size, mtime)], or [] if path does not exist. """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return []
+        return [(path, stat.st_size, stat.st_mtime)]
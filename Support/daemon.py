@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Helpers for the bundle’s optional background processes.
+"""
+
+import os
+import sys
+import signal
+
+def detach():
+    """
+    Fork a detached background process. Returns True in the background
+    process and False in the original one.
+    """
+    # don’t let both processes flush the same buffered output
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    pid = os.fork()
+    if pid:
+        os.waitpid(pid, 0)
+        return False
+
+    os.setsid()
+    if os.fork():
+        os._exit(0)
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.chdir('/')
+    return True
+
+def is_running(pid):
+    """
+    Is the process running? A process that has exited but not been
+    reaped (a zombie) is not: that happens to processes whose parent
+    exited, if the init process is slow to reap them.
+    """
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+
+    try:
+        with open('/proc/%d/stat' % pid, 'r') as infile:
+            # the state follows the parenthesized command name
+            return infile.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (IOError, IndexError):
+        pass
+
+    import subprocess
+    try:
+        state = subprocess.check_output(['ps', '-o', 'stat=', '-p', str(pid)])
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return not state.strip().startswith(b'Z')
+
+def read_pid(pid_file):
+    """ Return the pid recorded in pid_file if that process is alive. """
+    try:
+        with open(pid_file, 'r') as infile:
+            pid = int(infile.read().strip())
+        os.kill(pid, 0)
+    except (IOError, OSError, ValueError):
+        return None
+    return pid
+
+def stop(pid_file):
+    """ Stop the process recorded in pid_file, if it is running. """
+    pid = read_pid(pid_file)
+    if pid:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    remove_quietly(pid_file)
+
+def remove_quietly(path):
+    """ Remove a file if it exists. """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
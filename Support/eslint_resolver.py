@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Find the ESLint executable for a file: the nearest node_modules/.bin
+install walking up from the file’s directory (so each package of a
+monorepo gets its own ESLint), otherwise the first one on PATH.
+
+Results are memoized per directory in a small persisted index. Each
+entry records the mtime of every .bin directory looked at, and is
+thrown away when one of them changes (a package was installed or
+removed).
+"""
+
+import os
+import cache
+
+# forget everything once this many directories are remembered
+MAX_DIRECTORIES = 500
+# {directory: {command: entry}} loaded from and saved to the index file
+_INDEX = None
+# PATH searches already done, keyed by (command, PATH value)
+_WHICH_CACHE = {}
+
+def get_index_file():
+    """ Where resolved binaries are remembered. """
+    return os.path.join(cache.cache_dir(), 'eslint-bins.json')
+
+def bin_mtime(bin_dir):
+    """ The modification time of a .bin directory, or None if missing. """
+    try:
+        return os.stat(bin_dir).st_mtime
+    except OSError:
+        return None
+
+def is_executable(path):
+    """ Is path an executable file? """
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+def walk_up(command, start_dir):
+    """
+    Look for node_modules/.bin/command in start_dir and its parents.
+    Returns (path or None, {bin_dir: mtime} for every .bin checked).
+    """
+    checked = {}
+    dirname = os.path.abspath(start_dir)
+    while True:
+        bin_dir = os.path.join(dirname, 'node_modules', '.bin')
+        checked[bin_dir] = bin_mtime(bin_dir)
+        candidate = os.path.join(bin_dir, command)
+        if checked[bin_dir] is not None and is_executable(candidate):
+            return candidate, checked
+
+        parent = os.path.dirname(dirname)
+        if parent == dirname:
+            return None, checked
+        dirname = parent
+
+def which(command, path_value):
+    """ Search a PATH value for command. Returns a path or None. """
+    key = (command, path_value)
+    if key not in _WHICH_CACHE:
+        _WHICH_CACHE[key] = None
+        for dirname in path_value.split(':'):
+            candidate = os.path.join(dirname, command)
+            if dirname and is_executable(candidate):
+                _WHICH_CACHE[key] = candidate
+                break
+    return _WHICH_CACHE[key]
+
+def load_index():
+    """ Load the persisted index once per process. """
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = cache.load_json(get_index_file(), {})
+    return _INDEX
+
+def lookup(command, start_dir):
+    """
+    Return the node_modules/.bin install of command nearest start_dir,
+    or None, using the index when it is still valid.
+    """
+    index = load_index()
+    start_dir = os.path.abspath(start_dir)
+
+    entry = index.get(start_dir, {}).get(command)
+    if entry and all(
+            bin_mtime(bin_dir) == mtime
+            for bin_dir, mtime in entry['checked'].items()):
+        return entry['path']
+
+    path, checked = walk_up(command, start_dir)
+    if len(index) >= MAX_DIRECTORIES:
+        index.clear()
+    index.setdefault(start_dir, {})[command] = {'path': path, 'checked': checked}
+    cache.save_json(get_index_file(), index)
+    return path
+
+def resolve(command, start_dir, path_value, cwd=None):
+    """
+    Return the absolute path of the ESLint executable to run, or command
+    itself if it cannot be found (so that running it reports the error).
+
+    command -- the eslint command (TM_JAVASCRIPT_ESLINT_ESLINT)
+    start_dir -- where to start looking, usually the file’s directory
+    path_value -- the PATH to search if no local install is found
+    cwd -- the directory ESLint runs in; a relative command containing
+        a slash is relative to it, as it would be for the OS
+    """
+    if os.sep in command:
+        return os.path.abspath(os.path.join(cwd or os.getcwd(), command))
+
+    found = None
+    if start_dir:
+        found = lookup(command, start_dir)
+    return found or which(command, path_value) or command
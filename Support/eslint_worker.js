@@ -0,0 +1,128 @@
+/* eslint-env node */
+
+// A warm ESLint worker, started and stopped by worker_pool.py. It loads
+// one ESLint install once and lints text sent over a Unix socket: one
+// JSON request line per connection, answered with one JSON line.
+//
+//     node eslint_worker.js SOCKET ESLINT_PACKAGE_DIR IDLE_SECONDS
+//
+// A request holds cwd, filePath, text, fix, quiet, rules (to turn off)
+// and config (a fingerprint of the config files; a new fingerprint gets
+// a fresh linter, so config changes are picked up). The answer holds
+// results, in the shape of ESLint’s JSON output, or error, and rss.
+//
+// Plugins stay in Node’s require cache, so a fresh linter would still
+// use old plugin code: worker_pool.py starts a new worker instead when
+// the installed plugins change.
+
+'use strict';
+
+var fs = require('fs');
+var net = require('net');
+
+var socketPath = process.argv[2];
+var eslintModule = require(process.argv[3]);
+var idleTimeout = parseInt(process.argv[4], 10) * 1000;
+
+// forget the linters set up for old configs once there are this many
+var MAX_LINTERS = 20;
+
+// linters already set up, keyed by cwd, fix, rules and config fingerprint
+var linters = {};
+var linterCount = 0;
+
+var getLinter = function(request) {
+  var key = JSON.stringify([
+    request.cwd, request.fix, request.rules, request.config
+  ]);
+  if (!linters[key]) {
+    if (linterCount >= MAX_LINTERS) {
+      linters = {};
+      linterCount = 0;
+    }
+    linters[key] = makeLinter(request);
+    linterCount += 1;
+  }
+  return linters[key];
+};
+
+// return function(text, filePath) resolving to ESLint’s results
+var makeLinter = function(request) {
+  var rules = {};
+  (request.rules || []).forEach(function(rule) { rules[rule] = 'off'; });
+
+  if (eslintModule.ESLint) {
+    var eslint = new eslintModule.ESLint({
+      cwd: request.cwd,
+      fix: request.fix,
+      overrideConfig: { rules: rules }
+    });
+    return function(text, filePath) {
+      return eslint.lintText(text, { filePath: filePath });
+    };
+  }
+
+  // ESLint 6 and earlier
+  var engine = new eslintModule.CLIEngine({
+    cwd: request.cwd,
+    fix: request.fix,
+    rules: rules
+  });
+  return function(text, filePath) {
+    return Promise.resolve(engine.executeOnText(text, filePath).results);
+  };
+};
+
+var respond = function(socket, answer) {
+  answer.rss = process.memoryUsage().rss;
+  socket.end(JSON.stringify(answer) + '\n');
+};
+
+var handle = function(socket, line) {
+  var request;
+  try {
+    request = JSON.parse(line);
+    getLinter(request)(request.text, request.filePath || undefined)
+      .then(function(results) {
+        if (request.quiet) {
+          var api = eslintModule.ESLint || eslintModule.CLIEngine;
+          results = api.getErrorResults(results);
+        }
+        respond(socket, { results: results });
+      }, function(err) {
+        respond(socket, { error: err.message || String(err) });
+      });
+  } catch (err) {
+    respond(socket, { error: err.message || String(err) });
+  }
+};
+
+var idleTimer = null;
+var resetIdleTimer = function() {
+  clearTimeout(idleTimer);
+  idleTimer = setTimeout(function() { process.exit(0); }, idleTimeout);
+};
+
+var server = net.createServer(function(socket) {
+  resetIdleTimer();
+  var buffer = '';
+  socket.setEncoding('utf8');
+  socket.on('data', function(chunk) {
+    buffer += chunk;
+    var newline = buffer.indexOf('\n');
+    if (newline >= 0) {
+      socket.removeAllListeners('data');
+      handle(socket, buffer.slice(0, newline));
+    }
+  });
+  socket.on('error', function() {});
+});
+
+var cleanUp = function() {
+  try { fs.unlinkSync(socketPath); } catch (err) { /* already gone */ }
+};
+process.on('exit', cleanUp);
+process.on('SIGTERM', function() { process.exit(0); });
+
+cleanUp();
+server.listen(socketPath, resetIdleTimer);
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Remember whether ESLint found anything it could fix in a piece of code,
+so that fixing code known to have nothing fixable needs no ESLint run.
+"""
+
+import os
+import time
+import cache
+
+MAX_ENTRIES = 1000
+
+def any_fixable(issues):
+    """ Can ESLint fix any of these issues? """
+    return any(issue.get('fixable', False) for issue in issues)
+
+class FixabilityIndex(object):
+    """
+    A persisted map from (content hash, config fingerprint) to whether
+    the content had any fixable problems. The least recently recorded
+    entries are dropped once there are more than max_entries.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        """
+        Initialize a new FixabilityIndex, loading any saved state.
+
+        max_entries -- how many results to keep
+        """
+        self.max_entries = max_entries
+        self.index_file = os.path.join(cache.cache_dir(), 'fixable.json')
+        self.entries = cache.load_json(self.index_file, {})
+
+    @classmethod
+    def key(cls, text_hash, config):
+        """ The index key for content with a config fingerprint. """
+        return cache.key_for('%s:%s' % (text_hash, config))
+
+    def lookup(self, text_hash, config):
+        """
+        Return True or False if it is known whether the content has
+        fixable problems under this config, otherwise None.
+        """
+        entry = self.entries.get(self.key(text_hash, config))
+        return entry[0] if entry else None
+
+    def record(self, text_hash, config, fixable):
+        """ Remember whether the content had fixable problems, and save. """
+        self.entries[self.key(text_hash, config)] = [fixable, time.time()]
+
+        if len(self.entries) > self.max_entries:
+            oldest = sorted(self.entries, key=lambda k: self.entries[k][1])
+            for key in oldest[:len(self.entries) - self.max_entries]:
+                del self.entries[key]
+
+        cache.save_json(self.index_file, self.entries)
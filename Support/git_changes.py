@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Find the files (and lines) changed on the current git branch, using
+plain git commands. Nothing here touches the network.
+"""
+
+import os
+import re
+import subprocess
+import batch
+
+HUNK_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+(?P<start>\d+)(?:,(?P<count>\d+))? @@')
+# branches tried, in order, when origin/HEAD is not set
+DEFAULT_BRANCHES = ('origin/main', 'origin/master', 'main', 'master')
+# files with at most this many changed lines can be filtered to them
+SMALL_CHANGE_LINES = 50
+
+class GitError(Exception):
+    """ Report a problem running git. """
+    def __init__(self, message):
+        super(self.__class__, self).__init__(message)
+        self.message = message
+
+    def __str__(self):
+        return repr(self.message)
+
+def git(args, cwd):
+    """ Run a git command and return its output, raising GitError on failure. """
+    try:
+        proc = subprocess.Popen(
+            ['git'] + args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd
+        )
+    except OSError as err:
+        raise GitError(err.__str__())
+
+    (stdout, stderr) = proc.communicate()
+    if not isinstance(stdout, str):
+        stdout = stdout.decode('utf-8')
+        stderr = stderr.decode('utf-8', 'replace')
+    if proc.returncode != 0:
+        raise GitError(stderr.strip() or 'git %s failed' % ' '.join(args))
+    return stdout
+
+def repo_root(cwd):
+    """ The top directory of the git work tree containing cwd. """
+    return git(['rev-parse', '--show-toplevel'], cwd).strip()
+
+def default_branch(cwd):
+    """ The branch this one will be merged into, or None if unknown. """
+    try:
+        return git(['symbolic-ref', '--quiet', '--short', 'refs/remotes/origin/HEAD'], cwd).strip()
+    except GitError:
+        pass
+
+    for branch in DEFAULT_BRANCHES:
+        try:
+            git(['rev-parse', '--verify', '--quiet', branch], cwd)
+            return branch
+        except GitError:
+            continue
+    return None
+
+def merge_base(cwd):
+    """
+    The commit where the current branch left the default branch. Falls
+    back to HEAD, so only uncommitted changes are found.
+    """
+    branch = default_branch(cwd)
+    if branch:
+        try:
+            return git(['merge-base', 'HEAD', branch], cwd).strip()
+        except GitError:
+            pass
+    return 'HEAD'
+
+def changed_files(cwd):
+    """
+    Return (base, files): the merge-base commit and the JavaScript and
+    HTML files changed since then, including uncommitted and untracked
+    files. Paths are absolute.
+    """
+    root = repo_root(cwd)
+    base = merge_base(root)
+
+    names = git(['diff', '--name-only', '--diff-filter=ACMR', '-z', base], root).split('\0')
+    names += git(['ls-files', '--others', '--exclude-standard', '-z'], root).split('\0')
+
+    files = set()
+    for name in names:
+        path = os.path.join(root, name)
+        if name and batch.is_validatable(name) and os.path.isfile(path):
+            files.add(path)
+    return base, sorted(files)
+
+def changed_lines(path, base):
+    """
+    Return the set of line numbers in path that changed since base, or
+    None if the whole file is new or no lines can be singled out (a
+    mode change, say). Where lines were only deleted, the lines on
+    either side of the deletion count as changed.
+    """
+    dirname = os.path.dirname(path)
+    diff = git(['diff', '-U0', '--no-color', base, '--', os.path.basename(path)], dirname)
+    if not diff:
+        # untracked, or not changed at all
+        tracked = git(['ls-files', '--', os.path.basename(path)], dirname)
+        return None if not tracked.strip() else set()
+
+    lines = set()
+    for line in diff.splitlines():
+        match = HUNK_RE.match(line)
+        if match:
+            start = int(match.group('start'))
+            count = int(match.group('count') or 1)
+            if count:
+                lines.update(range(start, start + count))
+            else:
+                # a deletion after line start (0 if at the top)
+                lines.update(n for n in (start, start + 1) if n > 0)
+    return lines or None
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Decide whether ESLint would ignore a file, using the .eslintignore in
+the directory ESLint runs from, without starting ESLint. Projects that
+use flat config (eslint.config.*) don’t read .eslintignore; for their
+files the decision is left to ESLint.
+"""
+
+import os
+import re
+import config_deps
+
+IGNORE_FILE = '.eslintignore'
+# patterns ESLint ignores even without an .eslintignore
+DEFAULT_PATTERNS = ['node_modules/', '/bower_components/']
+# compiled patterns, keyed by ignore file path: (mtime, patterns)
+_PATTERN_CACHE = {}
+# whether a flat config applies, keyed by directory
+_FLAT_CONFIG_CACHE = {}
+
+def glob_to_regex(glob):
+    """ Translate the glob part of a gitignore-style pattern to a regex. """
+    parts = []
+    i = 0
+    while i < len(glob):
+        if glob.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif glob.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif glob[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif glob[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif glob[i] == '[' and ']' in glob[i + 1:]:
+            end = glob.index(']', i + 1)
+            parts.append('[%s]' % glob[i + 1:end].replace('!', '^', 1).replace('\\', '\\\\'))
+            i = end + 1
+        else:
+            parts.append(re.escape(glob[i]))
+            i += 1
+    return ''.join(parts)
+
+def compile_pattern(line):
+    """
+    Compile one line of an ignore file. Returns (regex, negated), or
+    None for blank lines and comments.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    # a slash anywhere but the end anchors the pattern to the base dir
+    anchored = '/' in line
+    line = line.lstrip('/')
+    if not line:
+        return None
+
+    regex = ('^' if anchored else '^(?:.*/)?') + glob_to_regex(line)
+    # matching a directory ignores everything in it
+    regex += '/.*$' if dir_only else '(?:/.*)?$'
+    return re.compile(regex), negated
+
+def load_patterns(base_dir):
+    """
+    Return the compiled patterns that apply in base_dir: the defaults
+    followed by those in its .eslintignore. Cached until the ignore
+    file changes.
+    """
+    path = os.path.join(base_dir, IGNORE_FILE)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = None
+
+    cached = _PATTERN_CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    lines = list(DEFAULT_PATTERNS)
+    if mtime is not None:
+        try:
+            with open(path, 'r') as infile:
+                lines.extend(infile.read().splitlines())
+        except IOError:
+            pass
+
+    patterns = [p for p in (compile_pattern(line) for line in lines) if p]
+    _PATTERN_CACHE[path] = (mtime, patterns)
+    return patterns
+
+def uses_flat_config(dirname):
+    """
+    Is there a flat config file in dirname or one of its parents?
+    Memoized for the life of the process.
+    """
+    if dirname not in _FLAT_CONFIG_CACHE:
+        found = any(
+            os.path.isfile(os.path.join(dirname, name))
+            for name in config_deps.FLAT_CONFIG_FILES
+        )
+        parent = os.path.dirname(dirname)
+        if not found and parent != dirname:
+            found = uses_flat_config(parent)
+        _FLAT_CONFIG_CACHE[dirname] = found
+    return _FLAT_CONFIG_CACHE[dirname]
+
+def is_ignored(filename, cwd=None):
+    """
+    Would ESLint, run from cwd, ignore filename? Files outside cwd are
+    never ignored. The last matching pattern wins, so later “!”
+    patterns can un-ignore files.
+    """
+    base_dir = os.path.abspath(cwd or os.getcwd())
+    relpath = os.path.relpath(os.path.abspath(filename), base_dir)
+    if relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+        return False
+    relpath = relpath.replace(os.sep, '/')
+
+    if uses_flat_config(os.path.dirname(os.path.abspath(filename))) or \
+            uses_flat_config(base_dir):
+        return False
+
+    ignored = False
+    for regex, negated in load_patterns(base_dir):
+        if regex.match(relpath):
+            ignored = not negated
+    return ignored
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Store validation results in a per-project SQLite database so they can
+be queried (next/previous issue, counts by rule) without running ESLint.
+Rows for files that have been deleted or renamed are dropped before the
+project-wide queries.
+"""
+
+import os
+import time
+import sqlite3
+import cache
+
+SEVERITY_ERROR = 2
+SEVERITY_WARNING = 1
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS files (
+        file TEXT PRIMARY KEY,
+        content_hash TEXT,
+        checked REAL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS issues (
+        file TEXT NOT NULL,
+        line INTEGER NOT NULL,
+        character INTEGER NOT NULL,
+        severity INTEGER NOT NULL,
+        rule TEXT,
+        reason TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS issues_position ON issues (file, line, character)',
+    'CREATE INDEX IF NOT EXISTS issues_severity ON issues (severity)',
+    'CREATE INDEX IF NOT EXISTS issues_rule ON issues (rule)'
+]
+
+ISSUE_COLUMNS = 'file, line, character, severity, rule, reason'
+
+class IssueDatabase(object):
+    """
+    The most recent issues found in each file of a project.
+    """
+
+    def __init__(self, project_dir):
+        """
+        Open (creating if needed) the database for a project.
+
+        project_dir -- the project directory (TM_PROJECT_DIRECTORY)
+        """
+        self.project_dir = os.path.abspath(project_dir)
+        self.db_file = os.path.join(
+            cache.cache_dir('projects', cache.key_for(self.project_dir)),
+            'issues.sqlite'
+        )
+        self.conn = sqlite3.connect(self.db_file, timeout=5)
+        with self.conn:
+            for statement in SCHEMA:
+                self.conn.execute(statement)
+
+    def close(self):
+        """ Close the database. """
+        self.conn.close()
+
+    def record(self, results):
+        """
+        Replace the stored issues for some files.
+
+        results -- a list of (filename, issues, content_hash) tuples;
+            content_hash may be None
+        """
+        now = time.time()
+        with self.conn:
+            for filename, issues, content_hash in results:
+                self.conn.execute('DELETE FROM issues WHERE file = ?', (filename,))
+                self.conn.executemany(
+                    'INSERT INTO issues (%s) VALUES (?, ?, ?, ?, ?, ?)' % ISSUE_COLUMNS,
+                    [(
+                        filename,
+                        issue['line'],
+                        issue['character'],
+                        SEVERITY_ERROR if issue['isError'] else SEVERITY_WARNING,
+                        issue.get('shortname', None),
+                        issue['reason']
+                    ) for issue in issues]
+                )
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO files (file, content_hash, checked) '
+                    'VALUES (?, ?, ?)',
+                    (filename, content_hash, now)
+                )
+
+    def forget_missing(self):
+        """ Drop the rows for files that no longer exist. """
+        files = [row[0] for row in self.conn.execute(
+            'SELECT file FROM files UNION SELECT DISTINCT file FROM issues'
+        )]
+        missing = [(filename,) for filename in files if not os.path.exists(filename)]
+        if missing:
+            with self.conn:
+                self.conn.executemany('DELETE FROM issues WHERE file = ?', missing)
+                self.conn.executemany('DELETE FROM files WHERE file = ?', missing)
+
+    def next_issue(self, filename, line, character):
+        """
+        Return the first issue after the given position: in the same
+        file if there is one, otherwise in the following files of the
+        project, wrapping around to the start. Returns a dict or None.
+        """
+        self.forget_missing()
+        return self._find(
+            'WHERE (file = ? AND (line > ? OR (line = ? AND character > ?))) '
+            'OR file > ? ORDER BY file, line, character',
+            (filename, line, line, character, filename)
+        ) or self._find('ORDER BY file, line, character', ())
+
+    def previous_issue(self, filename, line, character):
+        """
+        Return the last issue before the given position, searching
+        backwards through the project and wrapping around to the end.
+        Returns a dict or None.
+        """
+        self.forget_missing()
+        return self._find(
+            'WHERE (file = ? AND (line < ? OR (line = ? AND character < ?))) '
+            'OR file < ? ORDER BY file DESC, line DESC, character DESC',
+            (filename, line, line, character, filename)
+        ) or self._find('ORDER BY file DESC, line DESC, character DESC', ())
+
+    def file_issues(self, filename):
+        """ Return the stored issues for one file, in order. """
+        return [self._to_issue(row) for row in self.conn.execute(
+            'SELECT %s FROM issues WHERE file = ? ORDER BY line, character' % ISSUE_COLUMNS,
+            (filename,)
+        )]
+
+    def rule_counts(self, filename=None):
+        """
+        Return a list of (rule, error_count, warning_count) tuples,
+        most frequent rule first, for one file or the whole project.
+        """
+        self.forget_missing()
+        where, params = '', ()
+        if filename:
+            where, params = 'WHERE file = ?', (filename,)
+        return self.conn.execute(
+            'SELECT rule, SUM(severity = ?), SUM(severity = ?) FROM issues '
+            '%s GROUP BY rule ORDER BY COUNT(*) DESC, rule' % where,
+            (SEVERITY_ERROR, SEVERITY_WARNING) + params
+        ).fetchall()
+
+    def _find(self, clause, params):
+        """ Return the first issue matching an SQL clause, or None. """
+        row = self.conn.execute(
+            'SELECT %s FROM issues %s LIMIT 1' % (ISSUE_COLUMNS, clause), params
+        ).fetchone()
+        return row and self._to_issue(row)
+
+    @classmethod
+    def _to_issue(cls, row):
+        """ Convert a row to an issue dict like those Validator returns. """
+        issue = {
+            'file': row[0],
+            'line': row[1],
+            'character': row[2],
+            'isError': row[3] == SEVERITY_ERROR,
+            'isWarning': row[3] == SEVERITY_WARNING,
+            'reason': row[5]
+        }
+        if row[4]:
+            issue['shortname'] = row[4]
+        return issue
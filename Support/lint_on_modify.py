@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lint a document as it is edited. Each edit saves the document’s text
+as its newest version; a background scheduler (at most one per
+document, guarded by a lock file) waits for a burst of edits to
+settle, lints the newest version, cancels that run if a newer version
+arrives, and publishes results only for the newest version.
+"""
+
+import os
+import time
+import fcntl
+import cache
+import daemon
+import validator
+
+# seconds without edits before linting starts
+DEBOUNCE = 0.3
+# how often the scheduler checks for a newer version while waiting
+POLL_INTERVAL = 0.05
+
+def document_dir(filename):
+    """ Where the versions of a document are kept. """
+    return cache.cache_dir('modified', cache.key_for(os.path.abspath(filename)))
+
+class DocumentVersions(object):
+    """ The newest version of a document’s text, shared between processes. """
+
+    def __init__(self, filename):
+        directory = document_dir(filename)
+        self.text_file = os.path.join(directory, 'text')
+        self.version_file = os.path.join(directory, 'version')
+        self.lock_file = os.path.join(directory, 'lock')
+
+    def save(self, text):
+        """ Store text as the newest version. """
+        cache.save_text(self.text_file, text)
+        cache.save_text(self.version_file, repr(time.time()))
+
+    def version(self):
+        """ The newest version number, or None. """
+        return cache.load_text(self.version_file)
+
+    def text(self):
+        """ The text of the newest version. """
+        return cache.load_text(self.text_file, '')
+
+    def age(self):
+        """ Seconds since the newest version was saved. """
+        try:
+            return time.time() - os.stat(self.version_file).st_mtime
+        except OSError:
+            return 0
+
+    def lock(self):
+        """
+        Take the scheduler lock without waiting. Returns the open lock
+        file, or None if another scheduler holds it.
+        """
+        lock = open(self.lock_file, 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            lock.close()
+            return None
+        return lock
+
+    def is_locked(self):
+        """ Is a scheduler running for this document? """
+        lock = self.lock()
+        if lock is None:
+            return True
+        lock.close()
+        return False
+
+def submit(filename, text, lint, publish):
+    """
+    Record an edit and make sure a scheduler will lint it. Returns
+    right away.
+
+    filename -- the document’s file
+    text -- the document’s current text
+    lint -- lint(text, should_cancel) returns issues; it should raise
+        validator.LintCancelled when should_cancel() becomes true
+    publish -- publish(issues) shows the issues for the newest version
+    """
+    versions = DocumentVersions(filename)
+    versions.save(text)
+
+    # a running scheduler picks up the new version itself
+    if versions.is_locked():
+        return
+    if daemon.detach():
+        try:
+            schedule(versions, lint, publish)
+        finally:
+            os._exit(0)
+
+def schedule(versions, lint, publish):
+    """
+    Lint the newest version until no newer one arrives, holding the
+    lock so that only one scheduler (and so one lint) runs per document.
+    """
+    linted = None
+    # an edit that arrives just before the lock is released finds it
+    # taken, so check for a newer version again after releasing it
+    while versions.version() != linted:
+        lock = versions.lock()
+        if lock is None:
+            return
+        try:
+            linted = run_pending(versions, lint, publish)
+        finally:
+            lock.close()
+
+def run_pending(versions, lint, publish):
+    """
+    Lint and publish versions until the newest one is done. Returns the
+    version last linted.
+    """
+    while True:
+        # let a burst of edits settle
+        while versions.age() < DEBOUNCE:
+            time.sleep(POLL_INTERVAL)
+
+        version = versions.version()
+        try:
+            issues = lint(versions.text(), lambda: versions.version() != version)
+        except validator.LintCancelled:
+            continue
+        except validator.ValidateError:
+            # a later edit or save will show the error
+            return version
+
+        if versions.version() == version:
+            publish(issues)
+            return version
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Rule profiles: validate-on-save can run a cheaper set of rules than the
+report and the other on-demand commands, which always run them all.
+
+TM_JAVASCRIPT_ESLINT_SAVE_PROFILE picks the profile used on save:
+
+    full    every configured rule (the default)
+    errors  only rules set to “error” (eslint --quiet)
+    fast    only the rules listed in TM_JAVASCRIPT_ESLINT_SAVE_RULES
+            (comma-separated); every other rule is turned off
+"""
+
+import os
+import cache
+
+FULL = 'full'
+ERRORS = 'errors'
+FAST = 'fast'
+PROFILES = (FULL, ERRORS, FAST)
+
+# how issues found with each profile are labelled
+LABELS = {
+    FULL: '',
+    ERRORS: 'errors only',
+    FAST: 'fast rules only'
+}
+
+def get_save_profile():
+    """ The profile to use when validating on save. """
+    profile = os.environ.get('TM_JAVASCRIPT_ESLINT_SAVE_PROFILE', FULL)
+    if profile not in PROFILES:
+        return FULL
+    if profile == FAST and not get_fast_rules():
+        return ERRORS
+    return profile
+
+def get_fast_rules():
+    """ The rules listed in TM_JAVASCRIPT_ESLINT_SAVE_RULES. """
+    rules = os.environ.get('TM_JAVASCRIPT_ESLINT_SAVE_RULES', '')
+    return [rule.strip() for rule in rules.split(',') if rule.strip()]
+
+def is_enabled(setting):
+    """ Is a rule setting from --print-config anything but “off”? """
+    if isinstance(setting, list):
+        setting = setting[0] if setting else 0
+    return setting not in (0, '0', 'off')
+
+def configured_rules(the_validator, filename, cwd, config):
+    """
+    Return the names of the rules turned on for filename, using eslint
+    --print-config. Cached by config fingerprint.
+    """
+    cache_file = os.path.join(cache.cache_dir('print-config'), config + '.json')
+    rules = cache.load_json(cache_file)
+    if rules is None:
+        settings = the_validator.print_config(filename, cwd).get('rules', {})
+        rules = sorted(name for name, setting in settings.items() if is_enabled(setting))
+        cache.save_json(cache_file, rules)
+    return rules
+
+def eslint_options(profile, the_validator, filename, cwd, config):
+    """
+    Return the extra ESLint options for a profile.
+
+    the_validator -- a Validator, used to run eslint --print-config
+    filename -- the file being validated; the fast profile needs it
+    cwd -- where ESLint runs
+    config -- the config fingerprint for filename (config_deps.py)
+    """
+    if profile == ERRORS or (profile == FAST and not filename):
+        return ['--quiet']
+    if profile == FAST:
+        fast = set(get_fast_rules())
+        options = []
+        for rule in configured_rules(the_validator, filename, cwd, config):
+            if rule not in fast:
+                options.extend(['--rule', '%s: off' % rule])
+        return options
+    return []
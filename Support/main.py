@@ -11,16 +11,40 @@ import sys
 import time
 import re
 import subprocess
+import cache
+import lint_profiles
 import validator
-from ashes import AshesEnv
+import version_check
+
+# The template engine and the report-only modules are imported on
+# first use so that validate-on-save, which only prints a tooltip,
+# starts as quickly as possible.
 
 THIS_DIR = os.path.abspath(os.path.dirname(__file__))
-BASE_PATH = 'tm-file://' + os.environ['TM_BUNDLE_SUPPORT']
-ASHES_ENV = AshesEnv([os.path.join(THIS_DIR, 'templates')])
+TEMPLATE_DIR = os.path.join(THIS_DIR, 'templates')
+_ASHES_ENV = None
 IGNORE_ISSUES = [
-    '^File ignored because of a matching ignore pattern'
+    re.compile('^File ignored because of a matching ignore pattern')
+]
+# seconds validate-on-save waits before showing the last known results
+SAVE_BUDGET = 2.0
+# environment needed to re-run validation from an open report window
+REFRESH_ENV = [
+    'PATH',
+    'NODE_PATH',
+    'TM_BUNDLE_SUPPORT',
+    'TM_DIRECTORY',
+    'TM_FILEPATH',
+    'TM_JAVASCRIPT_ESLINT_CACHE_DIR',
+    'TM_JAVASCRIPT_ESLINT_ESLINT',
+    'TM_PROJECT_DIRECTORY',
+    'TM_SCOPE'
 ]
 
+def get_base_path():
+    """ The URL of the bundle support dir, used to link to assets. """
+    return 'tm-file://' + os.environ['TM_BUNDLE_SUPPORT']
+
 def get_cwd():
     """ What directory should we cd to before running eslint? """
     cwd = os.environ.get('TM_PROJECT_DIRECTORY', None)
@@ -31,15 +55,130 @@ def get_cwd():
 def should_ignore(issue_reason):
     """ Given the reason text for an issue, should we ignore it? """
     for rx in IGNORE_ISSUES:
-        if re.match(rx, issue_reason):
+        if rx.match(issue_reason):
             return True
     return False
 
-def validate():
+def get_ashes_env():
+    """ Return the template environment, creating it on first use. """
+    global _ASHES_ENV   # pylint: disable=global-statement
+    if _ASHES_ENV is None:
+        from ashes import AshesEnv
+        _ASHES_ENV = AshesEnv([TEMPLATE_DIR])
+    return _ASHES_ENV
+
+def render(template_name, context):
+    """ Render a template. """
+    return get_ashes_env().render(template_name, context)
+
+def render_cached(template_name, context):
+    """
+    Render a template, reusing the HTML from an earlier render with the
+    same context and templates if there is one.
+    """
+    import render_cache
+    renders = render_cache.RenderCache(TEMPLATE_DIR)
+    key = renders.fingerprint(template_name, context)
+
+    html = renders.get(key)
+    if html is None:
+        html = render(template_name, context)
+        renders.put(key, html)
+    return html
+
+def report_error(err):
+    """ Output an HTML page describing a ValidateError and exit. """
+    context = {
+        'BASE_PATH': get_base_path(),
+        'timestamp': time.strftime('%c'),
+        'errorMessage': err.message,
+    }
+    if err.path:
+        context['searchPath'] = err.path
+        html = render('error_eslint_path.html', context)
+    else:
+        html = render('error_eslint_other.html', context)
+    print(html)
+    sys.exit()
+
+def report_git_error(err):
+    """ Output an HTML page describing a git_changes.GitError and exit. """
+    context = {
+        'BASE_PATH': get_base_path(),
+        'timestamp': time.strftime('%c'),
+        'errorMessage': err.message,
+    }
+    print(render('error_git.html', context))
+    sys.exit()
+
+def validate(input_iterable=None, profile=lint_profiles.FULL, budget=None):
     """
     Run ESLint validation using settings from the current TextMate
-    environment. Return a list of issues.
+    environment. Return a list of issues. Errors are reported as HTML;
+    validator.OverBudget is raised if budget (seconds) runs out.
     """
+    try:
+        return run_validator(input_iterable, profile, budget)
+    except validator.ValidateError as err:
+        report_error(err)
+
+def open_project_index():
+    """
+    Return the ProjectIndex for the current project, or None if there
+    is no project or it has never been indexed.
+    """
+    cwd = get_cwd()
+    if not cwd or 'TM_FILEPATH' not in os.environ:
+        return None
+
+    import project_index
+    if not os.path.exists(project_index.index_file_for(cwd)):
+        return None
+    eslint_command = os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint')
+    return project_index.ProjectIndex(cwd, eslint_command)
+
+def run_validator(input_iterable=None, profile=lint_profiles.FULL, budget=None):
+    """
+    Run ESLint validation using settings from the current TextMate
+    environment. Return a list of issues, each labelled with the rule
+    profile (lint_profiles.py) that found it, or raise ValidateError.
+
+    If the project index already holds results for this exact content
+    (from a project lint or the background watcher), they are returned
+    without running ESLint. Only results from the full profile are
+    stored, since the others are incomplete.
+    """
+    if input_iterable is None:
+        input_iterable = sys.stdin
+
+    text = ''.join(input_iterable)
+    text_hash = cache.key_for(text)
+    if 'TM_FILEPATH' in os.environ and \
+            int(os.environ.get('TM_INPUT_START_LINE', 1)) == 1:
+        cache.save_text(get_latest_content_file(os.environ['TM_FILEPATH']), text_hash)
+
+    index = open_project_index()
+    issues = None
+    if index:
+        issues = index.lookup_content(os.environ['TM_FILEPATH'], text_hash)
+
+    if issues is not None:
+        profile = lint_profiles.FULL
+    else:
+        issues = validate_input([text], profile, budget)
+        if profile == lint_profiles.FULL:
+            if index:
+                index.store_content(os.environ['TM_FILEPATH'], text_hash, issues)
+                index.save()
+            record_fixability(text_hash, issues)
+
+    for issue in issues:
+        issue['tier'] = profile
+    return issues
+
+def validate_input(input_iterable, profile=lint_profiles.FULL, budget=None,
+                   should_cancel=None):
+    """ Run ESLint on input_iterable using the TextMate environment. """
 
     eslint_command = os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint')
     the_validator = validator.Validator(eslint_command)
@@ -49,76 +188,581 @@ def validate():
     line_offset = int(os.environ.get('TM_INPUT_START_LINE', 1)) - 1
     cwd = get_cwd()
 
-    try:
-        issues = the_validator.run(
+    import config_deps
+    config = None
+    if filename:
+        config = config_deps.ConfigDependencies(eslint_command).fingerprint(filename)
+
+    options = []
+    if profile != lint_profiles.FULL:
+        options = lint_profiles.eslint_options(profile, the_validator, filename, cwd, config)
+
+    text = ''.join(input_iterable)
+    deadline = time.time() + budget if budget else None
+
+    def lint():
+        """ Run ESLint, within what is left of the budget. """
+        remaining = budget
+        if deadline:
+            remaining = max(deadline - time.time(), 0.001)
+        return the_validator.run(
+            input_iterable=[text],
             filename=filename,
             input_is_html=input_is_html,
             line_offset=line_offset,
-            cwd=cwd
+            cwd=cwd,
+            options=options,
+            budget=remaining,
+            should_cancel=should_cancel
         )
-    except validator.ValidateError as err:
-        context = {
-            'BASE_PATH': BASE_PATH,
-            'timestamp': time.strftime('%c'),
-            'errorMessage': err.message,
-        }
-        if err.path:
-            context['searchPath'] = err.path
-            html = ASHES_ENV.render('error_eslint_path.html', context)
-        else:
-            html = ASHES_ENV.render('error_eslint_other.html', context)
-        print(html)
-        sys.exit()
 
+    if not filename or should_cancel:
+        # runs that can be cancelled are not shared
+        return lint()
+
+    # share one ESLint run between identical concurrent requests; a run
+    # finished in the background (see finish_in_background) is shared too
+    import single_flight
+    key = cache.key_for('\0'.join([
+        cache.key_for(text), config, filename, cwd or '',
+        repr(input_is_html), repr(line_offset), ' '.join(options)
+    ]))
+    try:
+        return single_flight.run(
+            key, lint, timeout=budget or None, handoff=(validator.OverBudget,))
+    except single_flight.Busy:
+        # another process is running ESLint on this and will show its results
+        raise validator.OverBudget(None)
+
+def get_save_budget():
+    """
+    How many seconds validate-on-save waits for ESLint before showing
+    the last known results (TM_JAVASCRIPT_ESLINT_SAVE_BUDGET; 0 means
+    wait for ESLint).
+    """
+    try:
+        return float(os.environ.get('TM_JAVASCRIPT_ESLINT_SAVE_BUDGET', SAVE_BUDGET))
+    except ValueError:
+        return SAVE_BUDGET
+
+def get_latest_content_file(filename):
+    """
+    Where the hash of the newest content validated for a file is kept,
+    so that background runs for older content don’t publish results.
+    """
+    return os.path.join(cache.cache_dir('latest-content'), cache.key_for(os.path.abspath(filename)))
+
+def finish_in_background(lint, profile, flight=None):
+    """
+    Let a slow ESLint run finish in a background process, which then
+    updates the gutter marks and stored results, unless newer content
+    has been validated meanwhile. Returns the last known issues for the
+    current file, each marked stale.
+
+    lint -- the RunningLint, or None if another process is running it
+    flight -- the single_flight.Flight for the run, if it is shared;
+        identical requests get its result once it finishes
+    """
+    import daemon
+    import issue_db
+
+    filename = os.environ['TM_FILEPATH']
+    latest_file = get_latest_content_file(filename)
+    content = cache.load_text(latest_file)
+
+    if lint and daemon.detach():
+        try:
+            # nobody is waiting on it now
+            lint.demote()
+            lint.wait_detached(validator.Validator.get_ceiling())
+            issues = lint.result()
+            if flight:
+                flight.finish(issues)
+            # a later save has (or will have) newer results
+            if cache.load_text(latest_file) == content:
+                for issue in issues:
+                    issue['tier'] = profile
+                update_gutter_marks(issues)
+                record_issues([(filename, issues, None)])
+        finally:
+            os._exit(0)
+
+    if flight:
+        # the background process holds the lock now
+        flight.close()
+
+    issues = []
+    if get_cwd():
+        try:
+            database = issue_db.IssueDatabase(get_cwd())
+            try:
+                issues = database.file_issues(filename)
+            finally:
+                database.close()
+        except issue_db.sqlite3.Error:
+            pass
+
+    for issue in issues:
+        issue['stale'] = True
     return issues
 
+def get_fixability_config():
+    """
+    Return the config fingerprint that fixability results for the
+    current document are stored under, or None if they should not be:
+    only whole, saved JavaScript documents can be fixed.
+    """
+    if 'TM_FILEPATH' not in os.environ or \
+            not os.environ.get('TM_SCOPE', '').startswith('source.js') or \
+            int(os.environ.get('TM_INPUT_START_LINE', 1)) != 1:
+        return None
+
+    import config_deps
+    eslint_command = os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint')
+    dependencies = config_deps.ConfigDependencies(eslint_command)
+    return dependencies.fingerprint(os.environ['TM_FILEPATH'])
+
+def record_fixability(text_hash, issues, config=None):
+    """ Remember whether ESLint can fix anything in the current document. """
+    # issues from before fixability was tracked say nothing about it
+    if not all('fixable' in issue for issue in issues):
+        return
+    config = config or get_fixability_config()
+    if config:
+        import fixability
+        fixability.FixabilityIndex().record(text_hash, config, fixability.any_fixable(issues))
+
+def record_issues(results):
+    """
+    Save validation results to the project’s issue database.
+
+    results -- a list of (filename, issues, content_hash) tuples
+    """
+    cwd = get_cwd()
+    if not cwd:
+        return
+
+    import issue_db
+    try:
+        database = issue_db.IssueDatabase(cwd)
+        try:
+            database.record([
+                (filename, [i for i in issues if not should_ignore(i['reason'])], content_hash)
+                for filename, issues, content_hash in results
+            ])
+        finally:
+            database.close()
+    except issue_db.sqlite3.Error:
+        # the database is a convenience; never fail validation over it
+        pass
+
+def issue_key(issue):
+    """ A short identifier that is stable across runs for the same issue. """
+    return cache.key_for('{0}:{1}:{2}:{3}:{4}'.format(
+        issue['line'],
+        issue['character'],
+        'E' if issue['isError'] else 'W',
+        issue['reason'],
+        issue.get('shortname', '')
+    ))[:16]
+
+def count_summary(issues):
+    """ Return the error and warning count strings used by the report. """
+    error_count = 0
+    warning_count = 0
+
+    for issue in issues:
+        if issue['isError']:
+            error_count += 1
+        if issue['isWarning']:
+            warning_count += 1
+
+    # the count strings are always present (but empty when the count is
+    # zero) so a per-file count never falls back to the report total
+    return {
+        'hasErrorsOrWarnings': error_count + warning_count > 0,
+        'errorCountString': pluralize(error_count, 'error'),
+        'warningCountString': pluralize(warning_count, 'warning')
+    }
+
+def pluralize(count, noun):
+    """ Return '1 error', '42 errors', or '' if count is zero. """
+    if not count:
+        return ''
+    if count == 1:
+        return '1 %s' % noun
+    return '%s %ss' % (count, noun)
+
+def get_report_state_file(filename):
+    """ Where we remember the issues last rendered for a file. """
+    return os.path.join(cache.cache_dir('reports'), cache.key_for(filename) + '.json')
+
+def get_refresh_command():
+    """
+    Return the shell command an open report runs to fetch the changes
+    since it was rendered.
+    """
+    try:
+        from shlex import quote
+    except ImportError:
+        from pipes import quote
+
+    assignments = [
+        '{0}={1}'.format(name, quote(os.environ[name]))
+        for name in REFRESH_ENV if name in os.environ
+    ]
+    return ' '.join(assignments + [
+        quote(sys.executable),
+        quote(os.path.join(THIS_DIR, 'main.py')),
+        '--json'
+    ])
+
 def full_report():
     """ Run ESLint and output an HTML report. """
 
     issues = validate()
 
     context = {
-        'BASE_PATH': BASE_PATH,
+        'BASE_PATH': get_base_path(),
         'issues': issues,
         'targetFilename': '(current unsaved file)',
         'targetUrl': 'txmt://open?line=1&amp;column=0'
     }
+    context.update(version_check.get_status())
+
+    for issue in issues:
+        issue['key'] = issue_key(issue)
 
     if 'TM_FILEPATH' in os.environ:
         context['targetFilename'] = os.path.relpath(os.environ['TM_FILEPATH'], get_cwd())
         context['targetUrl'] = 'txmt://open?url=file://%s' % os.environ['TM_FILEPATH']
+        context['refreshCommand'] = get_refresh_command()
+        cache.save_json(get_report_state_file(os.environ['TM_FILEPATH']), issues)
+        record_issues([(os.environ['TM_FILEPATH'], issues, None)])
 
-    error_count = 0
-    warning_count = 0
+    context.update(count_summary(issues))
 
-    for issue in issues:
-        if issue['isError']:
-            error_count += 1
-        if issue['isWarning']:
-            warning_count += 1
+    html = render_cached('report.html', context)
+    print(html)
+
+
+def get_selected_paths():
+    """
+    The files and folders selected in the project drawer, or the
+    project (or current) directory if nothing is selected.
+    """
+    selected = os.environ.get('TM_SELECTED_FILES', None)
+    if selected:
+        import shlex
+        return shlex.split(selected)
+    return [get_cwd()]
+
+def multi_report(paths, title):
+    """
+    Validate the JavaScript and HTML files in paths in parallel and
+    output a combined HTML report.
+    """
+    import batch
+
+    eslint_command = os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint')
+    filenames = batch.expand_paths(paths)
+    results = batch.validate_files(filenames, eslint_command, get_cwd())
+    render_multi_report(results, title)
+
+def render_multi_report(results, title, shown_lines=None):
+    """
+    Output a combined HTML report.
+
+    results -- a list of (filename, issues, error_message) tuples
+    title -- display name for what was validated
+    shown_lines -- optional {filename: set of line numbers}; only issues
+        on those lines are shown for those files (all are recorded)
+    """
+    record_issues([
+        (filename, issues, None)
+        for filename, issues, error_message in results if not error_message
+    ])
 
-    context['hasErrorsOrWarnings'] = error_count + warning_count > 0
+    cwd = get_cwd()
+    files = []
+    all_issues = []
+    clean_count = 0
+
+    for filename, issues, error_message in results:
+        issues = [i for i in issues if not should_ignore(i['reason'])]
+        if shown_lines and filename in shown_lines:
+            issues = [i for i in issues if i['line'] in shown_lines[filename]]
+        if not issues and not error_message:
+            clean_count += 1
+            continue
 
-    if error_count == 1:
-        context['errorCountString'] = '1 error'
-    elif error_count:
-        context['errorCountString'] = '%s errors' % error_count
+        entry = {
+            'targetFilename': os.path.relpath(filename, cwd),
+            'targetUrl': 'txmt://open?url=file://%s' % filename,
+            'issues': issues
+        }
+        entry.update(count_summary(issues))
+        if error_message:
+            entry['errorMessage'] = error_message
+        files.append(entry)
+        all_issues.extend(issues)
 
-    if warning_count == 1:
-        context['warningCountString'] = '1 warning'
-    elif warning_count:
-        context['warningCountString'] = '%s warnings' % warning_count
+    context = {
+        'BASE_PATH': get_base_path(),
+        'targetFilename': title,
+        'fileCountString': pluralize(len(results), 'file') or 'no files',
+        'cleanFileCountString': pluralize(clean_count, 'file'),
+        'files': files
+    }
+    context.update(count_summary(all_issues))
+    context.update(version_check.get_status())
 
-    html = ASHES_ENV.render('report.html', context)
+    html = render_cached('multi_report.html', context)
     print(html)
 
+def selected_report():
+    """ Validate the selected files and folders and output a report. """
+    paths = get_selected_paths()
+    if len(paths) == 1:
+        title = os.path.relpath(paths[0], get_cwd())
+        if title == '.':
+            title = os.path.basename(os.path.abspath(paths[0]))
+    else:
+        title = '%s selected items' % len(paths)
+    multi_report(paths, title)
+
+def project_report():
+    """
+    Validate every JavaScript and HTML file in the project and output a
+    combined report. Only files that changed (or whose ESLint config
+    changed) since the last project lint are validated again.
+    """
+    import batch
+    import project_index
+
+    project_dir = get_cwd()
+    eslint_command = os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint')
+    index = project_index.ProjectIndex(project_dir, eslint_command)
+
+    filenames = batch.expand_paths([project_dir])
+    results = []
+    stale = []
+    signatures = {}
+
+    for filename in filenames:
+        try:
+            issues, signatures[filename] = index.check(filename)
+        except (IOError, OSError):
+            continue
+        if issues is None:
+            stale.append(filename)
+        else:
+            results.append((filename, issues, None))
+
+    for filename, issues, error_message in batch.validate_files(
+            stale, eslint_command, project_dir):
+        if not error_message:
+            index.store(filename, signatures[filename], issues)
+        results.append((filename, issues, error_message))
+
+    index.prune(filenames)
+    index.save()
+
+    results.sort(key=lambda result: result[0])
+    render_multi_report(results, os.path.basename(project_dir))
+
+def changed_report():
+    """
+    Validate the files changed since this branch left the default
+    branch, including uncommitted and untracked files, and output a
+    combined report.
+
+    With TM_JAVASCRIPT_ESLINT_CHANGED_LINES_ONLY=1, files with only a
+    few changed lines show just the issues on those lines.
+    """
+    import batch
+    import git_changes
+
+    cwd = get_cwd()
+    eslint_command = os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint')
+    try:
+        base, filenames = git_changes.changed_files(cwd)
+        results = batch.validate_files(filenames, eslint_command, cwd)
+
+        shown_lines = {}
+        if os.environ.get('TM_JAVASCRIPT_ESLINT_CHANGED_LINES_ONLY') == '1':
+            for filename, issues, error_message in results:
+                lines = git_changes.changed_lines(filename, base)
+                if lines is not None and len(lines) <= git_changes.SMALL_CHANGE_LINES:
+                    shown_lines[filename] = lines
+    except git_changes.GitError as err:
+        report_git_error(err)
+
+    render_multi_report(results, 'changes since %s' % base[:7], shown_lines)
+
+def go_to_issue(forward=True):
+    """
+    Move the caret to the next (or previous) issue recorded for the
+    project, starting from the caret position, and describe it.
+    """
+    import issue_db
+
+    filename = os.environ.get('TM_FILEPATH', '')
+    line = int(os.environ.get('TM_LINE_NUMBER', 1))
+    character = int(os.environ.get('TM_LINE_INDEX', 0)) + 1
+
+    if not get_cwd():
+        print('Issues are recorded per project. Open a project or a saved file first.')
+        return
+
+    try:
+        database = issue_db.IssueDatabase(get_cwd())
+        try:
+            if forward:
+                issue = database.next_issue(filename, line, character)
+            else:
+                issue = database.previous_issue(filename, line, character)
+        finally:
+            database.close()
+    except issue_db.sqlite3.Error as err:
+        print('Could not read the ESLint issue database: {0}'.format(err))
+        return
+
+    if not issue:
+        print('No ESLint issues found. Save a file to validate it.')
+        return
+
+    subprocess.call([
+        os.environ['TM_MATE'],
+        '--line={0}:{1}'.format(issue['line'], issue['character']),
+        issue['file']
+    ])
+
+    message = issue['reason']
+    if 'shortname' in issue:
+        message += ' ({0})'.format(issue['shortname'])
+    if issue['file'] != filename:
+        message = '{0}: {1}'.format(os.path.relpath(issue['file'], get_cwd()), message)
+    print(message)
+
+def rule_counts():
+    """ Summarize the issues recorded for the project by rule. """
+    import issue_db
+
+    if not get_cwd():
+        print('Issues are recorded per project. Open a project or a saved file first.')
+        return
+
+    try:
+        database = issue_db.IssueDatabase(get_cwd())
+        try:
+            counts = database.rule_counts()
+        finally:
+            database.close()
+    except issue_db.sqlite3.Error as err:
+        print('Could not read the ESLint issue database: {0}'.format(err))
+        return
+
+    if not counts:
+        print('No ESLint issues found. Save a file to validate it.')
+        return
+
+    lines = []
+    for rule, error_count, warning_count in counts:
+        parts = [pluralize(error_count, 'error'), pluralize(warning_count, 'warning')]
+        lines.append('{0}: {1}'.format(rule or '(no rule)', ', '.join(p for p in parts if p)))
+    print('\n'.join(lines))
+
+def json_refresh():
+    """
+    Re-validate the saved file and output, as JSON, the issues that were
+    added and removed since the report was last rendered.
+    """
+    import json
+
+    filename = os.environ['TM_FILEPATH']
+
+    try:
+        with open(filename, 'r') as infile:
+            issues = run_validator(infile)
+    except validator.ValidateError as err:
+        print(json.dumps({'error': err.message}))
+        return
+    except IOError as err:
+        print(json.dumps({'error': str(err)}))
+        return
+
+    state_file = get_report_state_file(filename)
+    previous_keys = set(issue['key'] for issue in cache.load_json(state_file, []))
+
+    for issue in issues:
+        issue['key'] = issue_key(issue)
+    current_keys = set(issue['key'] for issue in issues)
+
+    result = count_summary(issues)
+    result['added'] = [i for i in issues if i['key'] not in previous_keys]
+    result['removed'] = sorted(previous_keys - current_keys)
+
+    cache.save_json(state_file, issues)
+    record_issues([(filename, issues, None)])
+    print(json.dumps(result))
+
 
 def quiet():
-    """ Run ESLint and display a summary of the results as a tooltip. """
+    """
+    Run ESLint and display a summary of the results as a tooltip, using
+    the save-time rule profile (TM_JAVASCRIPT_ESLINT_SAVE_PROFILE).
+    """
+    profile = lint_profiles.get_save_profile()
+    try:
+        issues = validate(profile=profile, budget=get_save_budget())
+    except validator.OverBudget as err:
+        issues = finish_in_background(err.lint, profile, getattr(err, 'flight', None))
+        result = summarize(issues)
+        if result:
+            result += '\r\rThese are the last known results: ESLint is still running.'
+        else:
+            result = 'ESLint is still running; the gutter will update when it finishes.'
+    else:
+        update_gutter_marks(issues)
+        record_issues([(os.environ['TM_FILEPATH'], issues, None)])
+        result = summarize(issues)
 
-    issues = validate()
-    update_gutter_marks(issues)
+    print(result)
+
+    # keep the cached update status fresh for the next report
+    version_check.refresh_in_background()
+
+    if os.environ.get('TM_JAVASCRIPT_ESLINT_WATCH') == '1' and \
+            os.environ.get('TM_PROJECT_DIRECTORY'):
+        import watcher
+        watcher.start(os.environ['TM_PROJECT_DIRECTORY'])
+
+
+def modified():
+    """
+    Lint the current document after it changes, if lint-on-modify is
+    turned on (TM_JAVASCRIPT_ESLINT_LINT_ON_MODIFY). Runs from the
+    document-modified callback, so it only hands the text to a
+    background scheduler and returns.
+    """
+    if os.environ.get('TM_JAVASCRIPT_ESLINT_LINT_ON_MODIFY') != '1' or \
+            'TM_FILEPATH' not in os.environ:
+        return
+
+    import lint_on_modify
+
+    def lint(text, should_cancel):
+        """ Lint one version of the document. """
+        return validate_input(
+            [text], lint_profiles.get_save_profile(), should_cancel=should_cancel)
 
+    lint_on_modify.submit(
+        os.environ['TM_FILEPATH'], ''.join(sys.stdin), lint, update_gutter_marks)
+
+
+def summarize(issues):
+    """ Return the one-line error and warning summary shown in tooltips. """
     error_count = 0
     warning_count = 0
 
@@ -136,10 +780,25 @@ def quiet():
     if warning_count > 0:
         parts.append('{0} warning{1}'.format(warning_count, 's' if warning_count > 1 else ''))
     result = ', '.join(parts)
+
+    # say if a cheaper rule profile was used
+    tiers = set(issue.get('tier', lint_profiles.FULL) for issue in issues)
+    tiers.discard(lint_profiles.FULL)
+    if result and tiers:
+        result += ' ({0})'.format(', '.join(lint_profiles.LABELS[t] for t in sorted(tiers)))
+
     if result:
         result += '\r\rPress Shift-Ctrl-V to view the full report.'
-    print(result)
+    return result
 
+def show_tooltip(text):
+    """
+    Show a tooltip using TextMate’s dialog tool, for commands whose
+    output goes somewhere else.
+    """
+    dialog = os.environ.get('DIALOG', None)
+    if dialog and text:
+        subprocess.call([dialog, 'tooltip', '--text', text])
 
 def update_gutter_marks(issues):
     """
@@ -183,44 +842,94 @@ def update_gutter_marks(issues):
 
 
 def fix():
-    """ Run the eslint --fix command against the current file. """
-    if 'TM_FILEPATH' not in os.environ:
-        # ignore if file is not saved
+    """
+    Fix the current document with eslint --fix-dry-run. The output
+    replaces the document, so nothing is written to disk and unsaved
+    documents can be fixed too. The same ESLint run reports the
+    problems that remain, which are shown in the gutter and a tooltip.
+    If anything goes wrong, the document is output unchanged.
+    """
+    text = ''.join(sys.stdin)
+    try:
+        output = fix_document(text)
+    except Exception as err:   # pylint: disable=broad-except
+        # an empty output would blank the document
+        write_document(text)
+        show_tooltip('ESLint could not fix the document: {0}'.format(err))
         return
+    write_document(output)
 
-    if not os.environ['TM_SCOPE'].startswith('source.js'):
+def fix_document(text):
+    """
+    Return the fixed text for fix(), updating the gutter and showing
+    the problems that remain.
+    """
+    if not os.environ.get('TM_SCOPE', '').startswith('source.js'):
         # refuse to run against HTML-embedded JavaScript
-        return
+        return text
+
+    # nothing to do if the last validation of this exact content found
+    # nothing ESLint could fix
+    text_hash = cache.key_for(text)
+    config = get_fixability_config()
+    if config:
+        import fixability
+        if fixability.FixabilityIndex().lookup(text_hash, config) is False:
+            show_tooltip('Nothing to fix.')
+            return text
 
     eslint_command = os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint')
     the_validator = validator.Validator(eslint_command)
-    filename = os.environ['TM_FILEPATH']
-    cwd = get_cwd()
+    filename = os.environ.get('TM_FILEPATH', None)
 
     try:
-        the_validator.fix(filename, cwd)
+        output, messages = the_validator.fix_text([text], filename, get_cwd())
     except validator.ValidateError as err:
-        context = {
-            'BASE_PATH': BASE_PATH,
-            'timestamp': time.strftime('%c'),
-            'errorMessage': err.message,
-        }
-        if err.path:
-            context['searchPath'] = err.path
-            html = ASHES_ENV.render('error_eslint_path.html', context)
-        else:
-            html = ASHES_ENV.render('error_eslint_other.html', context)
-        print(html)
-        sys.exit()
-
-    mate = os.environ['TM_MATE']
-    subprocess.call([mate, '--clear-mark=warning', filename])
-
-
-if __name__ == '__main__':
-    if '--html' in sys.argv:
+        report_error(err)
+    if output is None:
+        output = text
+
+    issues = validator.Validator.parse_json_messages(messages, filename=filename)
+    if filename:
+        update_gutter_marks(issues)
+        record_issues([(filename, issues, None)])
+    if config:
+        record_fixability(cache.key_for(output), issues, config)
+    show_tooltip(summarize(issues) or 'No problems remain.')
+    return output
+
+def write_document(text):
+    """ Output text that replaces the document, exactly as given. """
+    if not isinstance(text, str):
+        text = text.encode('utf-8')
+    sys.stdout.write(text)
+
+
+def main(argv):
+    """ Run the command selected by the command-line arguments. """
+    if '--html' in argv:
         full_report()
-    elif '--fix' in sys.argv:
+    elif '--json' in argv:
+        json_refresh()
+    elif '--selected' in argv:
+        selected_report()
+    elif '--project' in argv:
+        project_report()
+    elif '--changed' in argv:
+        changed_report()
+    elif '--next-issue' in argv:
+        go_to_issue(forward=True)
+    elif '--previous-issue' in argv:
+        go_to_issue(forward=False)
+    elif '--rule-counts' in argv:
+        rule_counts()
+    elif '--fix' in argv:
         fix()
+    elif '--modified' in argv:
+        modified()
     else:
         quiet()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Remember the issues found in each file of a project so that a project
+lint only has to re-run ESLint on files that changed.
+
+Several processes (saves, project lints, the watcher) update the index
+at once, so each one saves only the entries it changed, merged into the
+saved index under a lock.
+"""
+
+import os
+import fcntl
+import cache
+import config_deps
+
+def index_file_for(project_dir):
+    """ Where the index for a project is stored. """
+    return os.path.join(
+        cache.cache_dir('projects', cache.key_for(os.path.abspath(project_dir))),
+        'index.json'
+    )
+
+def content_hash(path):
+    """ Return a hash of a file’s contents. """
+    with open(path, 'rb') as infile:
+        return cache.key_for(infile.read())
+
+class ProjectIndex(object):
+    """
+    A persisted record of each project file’s size, mtime, content
+    hash, config fingerprint and last issues.
+    """
+
+    def __init__(self, project_dir, eslint_command='eslint'):
+        """
+        Initialize a new ProjectIndex, loading any saved state.
+
+        project_dir -- the project directory (TM_PROJECT_DIRECTORY)
+        eslint_command -- the eslint command; results from a different
+            command are never reused
+        """
+        self.project_dir = os.path.abspath(project_dir)
+        self.eslint_command = eslint_command
+        self.index_file = index_file_for(self.project_dir)
+        self.entries = cache.load_json(self.index_file, {})
+        # keys stored or deleted since the index was loaded
+        self.changed = set()
+        self.config = config_deps.ConfigDependencies(eslint_command)
+
+    def config_fingerprint(self, path):
+        """
+        Return a fingerprint of the config files and ESLint packages
+        that apply to path (see config_deps.py).
+        """
+        return self.config.fingerprint(path)
+
+    def check(self, path):
+        """
+        Look up a file. Returns (issues, signature): issues is None if
+        the file must be validated again; signature describes the
+        file’s current state and is passed to store() afterwards.
+        """
+        signature = self._signature(path)
+
+        entry = self.entries.get(self._key(path))
+        if not entry or entry['config'] != signature['config'] or \
+                entry['size'] != signature['size']:
+            signature['hash'] = content_hash(path)
+            return None, signature
+
+        if entry['mtime'] == signature['mtime']:
+            signature['hash'] = entry['hash']
+            return entry['issues'], signature
+
+        # touched but maybe not changed
+        signature['hash'] = content_hash(path)
+        if signature['hash'] == entry['hash']:
+            entry['mtime'] = signature['mtime']
+            self.changed.add(self._key(path))
+            return entry['issues'], signature
+
+        return None, signature
+
+    def lookup_content(self, path, text_hash):
+        """
+        Return the stored issues for path if they were found in content
+        with the given hash under the current config, otherwise None.
+        """
+        entry = self.entries.get(self._key(path))
+        if entry and entry['hash'] == text_hash and \
+                entry['config'] == self.config_fingerprint(path):
+            return entry['issues']
+        return None
+
+    def store_content(self, path, text_hash, issues):
+        """
+        Record issues found in content that was not read from disk (an
+        editor buffer). Ignored unless the file on disk has that content.
+        """
+        try:
+            signature = self._signature(path)
+            signature['hash'] = content_hash(path)
+        except (IOError, OSError):
+            return
+        if signature['hash'] == text_hash:
+            self.store(path, signature, issues)
+
+    def store(self, path, signature, issues):
+        """ Record the issues found for a file in the given state. """
+        entry = dict(signature)
+        entry['issues'] = issues
+        self.entries[self._key(path)] = entry
+        self.changed.add(self._key(path))
+
+    def prune(self, paths):
+        """ Forget every file that is not in paths. """
+        keep = set(self._key(path) for path in paths)
+        for key in list(self.entries):
+            if key not in keep:
+                del self.entries[key]
+                self.changed.add(key)
+
+    def invalidate(self, changed_paths):
+        """
+        Forget the files below the directory of each changed config
+        file; results elsewhere in the project are kept.
+        """
+        dirs = [config_deps.affected_dir(path) for path in changed_paths]
+        dirs = [d for d in dirs if d]
+        if not dirs:
+            return
+        for key in list(self.entries):
+            path = os.path.join(self.project_dir, key)
+            if any(config_deps.is_within(path, d) for d in dirs):
+                del self.entries[key]
+                self.changed.add(key)
+
+    def save(self):
+        """
+        Persist the changes made since the index was loaded, keeping
+        entries that other processes have saved meanwhile.
+        """
+        if not self.changed:
+            return
+        lock = open(self.index_file + '.lock', 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = cache.load_json(self.index_file, {})
+            for key in self.changed:
+                if key in self.entries:
+                    entries[key] = self.entries[key]
+                else:
+                    entries.pop(key, None)
+            cache.save_json(self.index_file, entries)
+        finally:
+            lock.close()
+        self.entries = entries
+        self.changed = set()
+
+    def _signature(self, path):
+        """ Describe a file’s current state, apart from its hash. """
+        stat = os.stat(path)
+        return {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'config': self.config_fingerprint(path)
+        }
+
+    def _key(self, path):
+        """ Files are indexed by their path relative to the project. """
+        return os.path.relpath(os.path.abspath(path), self.project_dir)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Remember rendered HTML so an unchanged report can be output without
+running the template engine.
+"""
+
+import os
+import json
+import cache
+
+MAX_ENTRIES = 20
+# template checksums already computed in this process, by template dir
+_TEMPLATE_CHECKSUMS = {}
+
+class RenderCache(object):
+    """
+    A small on-disk cache of rendered templates, keyed by a fingerprint
+    of the render context and the template sources. The least recently
+    used entries are evicted once there are more than max_entries.
+    """
+
+    def __init__(self, template_dir, max_entries=MAX_ENTRIES):
+        """
+        Initialize a new RenderCache.
+
+        template_dir -- the directory holding the templates; their
+            contents are part of every fingerprint
+        max_entries -- how many rendered pages to keep
+        """
+        self.template_dir = template_dir
+        self.max_entries = max_entries
+        self.cache_dir = cache.cache_dir('rendered')
+        self.index_file = os.path.join(self.cache_dir, 'index.json')
+
+    def template_checksum(self):
+        """ Return a checksum of every template in the template dir. """
+        if self.template_dir not in _TEMPLATE_CHECKSUMS:
+            parts = []
+            for name in sorted(os.listdir(self.template_dir)):
+                with open(os.path.join(self.template_dir, name), 'rb') as infile:
+                    parts.append(name.encode('utf-8') + b'\0' + infile.read())
+            _TEMPLATE_CHECKSUMS[self.template_dir] = cache.key_for(b'\0'.join(parts))
+        return _TEMPLATE_CHECKSUMS[self.template_dir]
+
+    def fingerprint(self, template_name, context):
+        """ Return the cache key for rendering template_name with context. """
+        return cache.key_for('\0'.join([
+            template_name,
+            self.template_checksum(),
+            json.dumps(context, sort_keys=True)
+        ]))
+
+    def get(self, key):
+        """ Return the cached HTML for key, or None. """
+        html = cache.load_text(os.path.join(self.cache_dir, key + '.html'))
+        if html is not None:
+            self._touch(key)
+        return html
+
+    def put(self, key, html):
+        """ Store the HTML for key, evicting old entries if needed. """
+        cache.save_text(os.path.join(self.cache_dir, key + '.html'), html)
+        self._touch(key)
+
+    def _touch(self, key):
+        """ Mark key as most recently used and evict the oldest entries. """
+        index = [k for k in cache.load_json(self.index_file, []) if k != key]
+        index.append(key)
+
+        while len(index) > self.max_entries:
+            evicted = index.pop(0)
+            try:
+                os.remove(os.path.join(self.cache_dir, evicted + '.html'))
+            except OSError:
+                pass
+
+        cache.save_json(self.index_file, index)
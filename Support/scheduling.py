@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Keep background lint work (project and multi-file runs, the watcher,
+slow runs finished after the tooltip is shown) out of the way of the
+editor: lower its CPU and I/O priority and limit how many ESLint
+processes it runs at once based on load and free memory. Validating
+the current document always runs at normal priority.
+"""
+
+import os
+import sys
+
+NICENESS = 10
+# a rough upper bound on the memory one ESLint process uses
+ESLINT_MEMORY = 300 * 1024 * 1024
+
+# Linux ioprio_set(2): the best-effort class at its lowest priority
+IOPRIO_WHO_PROCESS = 1
+PRIO_PROCESS = 0
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_LOWEST = 7
+# syscall numbers for ioprio_set, by machine
+IOPRIO_SET_SYSCALLS = {
+    'x86_64': 251,
+    'i386': 289,
+    'i686': 289,
+    'aarch64': 30,
+    'arm64': 30
+}
+# macOS setiopolicy_np(3): throttle this process’s disk I/O
+IOPOL_TYPE_DISK = 0
+IOPOL_SCOPE_PROCESS = 0
+IOPOL_THROTTLE = 3
+
+# the C library, loaded on first use
+_LIBC = None
+
+def get_libc():
+    """ Return the C library, or None if it can’t be loaded. """
+    global _LIBC   # pylint: disable=global-statement
+    if _LIBC is None:
+        import ctypes
+        import ctypes.util
+        try:
+            _LIBC = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        except OSError:
+            _LIBC = False
+    return _LIBC or None
+
+def lower_io_priority(libc, pid=0):
+    """
+    Lower the I/O priority of a process (by default the current one),
+    if supported. On macOS only the current process can be changed.
+    """
+    if libc is None:
+        return
+    try:
+        if sys.platform.startswith('linux'):
+            syscall = IOPRIO_SET_SYSCALLS.get(os.uname()[4])
+            if syscall:
+                libc.syscall(
+                    syscall, IOPRIO_WHO_PROCESS, pid,
+                    (IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | IOPRIO_LOWEST
+                )
+        elif sys.platform == 'darwin' and not pid:
+            libc.setiopolicy_np(IOPOL_TYPE_DISK, IOPOL_SCOPE_PROCESS, IOPOL_THROTTLE)
+    except AttributeError:
+        # a lower priority is a courtesy; carry on without it
+        pass
+
+def background_preexec():
+    """
+    Return a function that lowers the CPU and I/O priority of the
+    process it runs in, for use as the preexec_fn of background ESLint
+    processes. The C library is loaded now, not in the child.
+    """
+    libc = get_libc()
+
+    def lower_priority():
+        """ Lower this process’s priority. """
+        try:
+            os.nice(NICENESS)
+        except OSError:
+            pass
+        lower_io_priority(libc)
+
+    return lower_priority
+
+def demote(pid):
+    """
+    Lower the CPU and I/O priority of a process that is already running,
+    e.g. an ESLint run that has moved to the background.
+    """
+    libc = get_libc()
+    if libc is None:
+        return
+    try:
+        current = os.getpriority(PRIO_PROCESS, pid)
+    except AttributeError:
+        current = 0
+    libc.setpriority(PRIO_PROCESS, pid, max(current, NICENESS))
+    lower_io_priority(libc, pid)
+
+def available_memory():
+    """ Bytes of memory available to new processes, or None if unknown. """
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/meminfo', 'r') as infile:
+                for line in infile:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024
+        except (IOError, ValueError):
+            pass
+        return None
+
+    if sys.platform == 'darwin':
+        import re
+        import subprocess
+        try:
+            output = subprocess.check_output(['vm_stat']).decode('utf-8')
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        page_size = re.search(r'page size of (\d+) bytes', output)
+        pages = re.findall(r'Pages (?:free|inactive|speculative):\s+(\d+)', output)
+        if page_size and pages:
+            return sum(int(p) for p in pages) * int(page_size.group(1))
+    return None
+
+def max_workers(wanted=None):
+    """
+    How many ESLint processes background work should run at once: one
+    per idle CPU, no more than available memory allows, and at least 1.
+
+    wanted -- an upper limit, such as the number of files to validate
+    """
+    import multiprocessing
+    cpus = multiprocessing.cpu_count()
+
+    try:
+        load = os.getloadavg()[0]
+    except (AttributeError, OSError):
+        load = 0
+    workers = cpus - int(load)
+
+    memory = available_memory()
+    if memory is not None:
+        workers = min(workers, memory // ESLINT_MEMORY)
+
+    if wanted is not None:
+        workers = min(workers, wanted)
+    return max(1, int(workers))
@@ -8,6 +8,9 @@ Given HTML input, return only the content found between
 
 import re
 
+START_TAG = re.compile(r'(\<\s*script)[\s\>]', re.IGNORECASE)
+END_TAG = re.compile(r'\<\/\s*script[\s\>]', re.IGNORECASE)
+
 def only_scripts(input_iterable):
     """
     Given HTML input, transform it by removing all content that is
@@ -20,13 +23,11 @@ def only_scripts(input_iterable):
     input_iterable -- must be iterable
     """
     lines = []
-    start_tag = re.compile(r'(\<\s*script)[\s\>]', re.IGNORECASE)
-    end_tag = re.compile(r'\<\/\s*script[\s\>]', re.IGNORECASE)
     state = 'IGNORE'
     for line in input_iterable:
         while line:
             if state == 'IGNORE':
-                match = start_tag.search(line)
+                match = START_TAG.search(line)
                 if match:
                     # found a script tag
                     line = ' ' * match.end(1) + line[match.end(1):]
@@ -45,7 +46,7 @@ def only_scripts(input_iterable):
                     line = None
 
             elif state == 'PIPE_TO_OUTPUT':
-                match = end_tag.search(line)
+                match = END_TAG.search(line)
                 if match:
                     # found closing </script> tag
                     line_part = line[:match.start()]
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+A long-lived process that keeps the bundle’s modules, templates and
+caches loaded so commands don’t pay Python startup costs every time.
+
+Commands reach it through client.py over a Unix socket. Each request
+is handled in a forked child, so the warm state is shared but never
+modified by a request.
+
+    python server.py start      start in the background
+    python server.py stop       stop a running server
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import glob
+import traceback
+import cache
+import daemon
+
+try:
+    from SocketServer import ForkingMixIn, UnixStreamServer, StreamRequestHandler
+    from StringIO import StringIO
+except ImportError:
+    from socketserver import ForkingMixIn, UnixStreamServer, StreamRequestHandler
+    from io import StringIO
+
+THIS_DIR = os.path.abspath(os.path.dirname(__file__))
+IDLE_TIMEOUT = 30 * 60
+
+def get_socket_path():
+    """ The Unix socket the server listens on. """
+    return os.path.join(cache.cache_dir(), 'server.sock')
+
+def get_pid_file():
+    """ Where the server records its process id. """
+    return os.path.join(cache.cache_dir(), 'server.pid')
+
+def sources_mtime():
+    """ The newest modification time of the code and templates we serve. """
+    paths = glob.glob(os.path.join(THIS_DIR, '*.py')) + \
+        glob.glob(os.path.join(THIS_DIR, 'templates', '*'))
+    return max(os.path.getmtime(path) for path in paths)
+
+def read_request(rfile):
+    """
+    Read a request: a JSON header line holding argv, env and cwd,
+    followed by the command’s stdin until end of stream.
+    """
+    header = json.loads(rfile.readline().decode('utf-8'))
+    stdin_data = rfile.read()
+    return header, stdin_data
+
+def write_response(wfile, status, output, error=''):
+    """
+    Write a response: a JSON header line holding the exit status and
+    any traceback for the client’s stderr, then the command output.
+    """
+    if not isinstance(output, bytes):
+        output = output.encode('utf-8')
+    header = {'status': status}
+    if error:
+        header['error'] = error
+    wfile.write(json.dumps(header).encode('utf-8') + b'\n')
+    wfile.write(output)
+
+class RequestHandler(StreamRequestHandler):
+    """ Run one bundle command in the (forked) handler process. """
+
+    def handle(self):
+        header, stdin_data = read_request(self.rfile)
+
+        os.environ.clear()
+        os.environ.update(header['env'])
+        if header.get('cwd'):
+            os.chdir(header['cwd'])
+
+        if str is not bytes:
+            stdin_data = stdin_data.decode('utf-8')
+        sys.stdin = StringIO(stdin_data)
+        sys.stdout = output = StringIO()
+        status = 0
+        error = ''
+
+        try:
+            import main
+            main.main(header['argv'])
+        except SystemExit as err:
+            status = err.code or 0
+        except Exception:   # pylint: disable=broad-except
+            # our stderr is /dev/null; the client prints this
+            error = traceback.format_exc()
+            status = 1
+        finally:
+            sys.stdout = sys.__stdout__
+
+        write_response(self.wfile, status, output.getvalue(), error)
+
+class BundleServer(ForkingMixIn, UnixStreamServer):
+    """
+    Serve bundle commands until idle for too long or until the bundle’s
+    code changes, so an upgraded bundle is never served by old code.
+    """
+
+    timeout = IDLE_TIMEOUT
+
+    def __init__(self, socket_path):
+        UnixStreamServer.__init__(self, socket_path, RequestHandler)
+        self.started_mtime = sources_mtime()
+        self.running = True
+
+    def verify_request(self, request, client_address):
+        if sources_mtime() != self.started_mtime:
+            # the client falls back to running in-process
+            self.running = False
+            return False
+        return True
+
+    def handle_timeout(self):
+        self.running = False
+
+    def serve(self):
+        """ Handle requests until it’s time to stop. """
+        while self.running:
+            self.handle_request()
+
+def warm_up():
+    """ Import and prepare everything a request is likely to need. """
+    import main
+    main.get_ashes_env().load_all()
+
+def serve():
+    """ Run the server in the current process. """
+    socket_path = get_socket_path()
+    daemon.remove_quietly(socket_path)
+
+    warm_up()
+    server = BundleServer(socket_path)
+    cache.save_text(get_pid_file(), str(os.getpid()))
+    try:
+        server.serve()
+    finally:
+        server.server_close()
+        daemon.remove_quietly(socket_path)
+        daemon.remove_quietly(get_pid_file())
+
+def start():
+    """ Start the server as a detached background process. """
+    if not daemon.detach():
+        return
+    try:
+        serve()
+    finally:
+        os._exit(0)
+
+def stop():
+    """ Stop a running server. """
+    daemon.stop(get_pid_file())
+    daemon.remove_quietly(get_socket_path())
+
+
+if __name__ == '__main__':
+    if 'start' in sys.argv:
+        start()
+    elif 'stop' in sys.argv:
+        stop()
+    else:
+        serve()
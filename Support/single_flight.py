@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Make concurrent identical requests (say, Save & Validate and the report
+for the same buffer, or two windows on one project) share a single
+ESLint run, across processes.
+
+Each request has a key. The first process to take the key’s lock file
+does the work and writes the result to a shared slot; the others wait
+on the lock and then read the slot instead of doing the work again.
+Work that outlives the request (a slow save finished in the
+background) keeps holding the lock until it is done.
+"""
+
+import os
+import time
+import fcntl
+import cache
+
+# how long a result can be handed to a request that arrives late
+RESULT_TTL = 10
+# slots older than this are deleted
+MAX_AGE = 60
+# longest wait between tries for a lock, when waiting has a deadline
+POLL_INTERVAL = 0.05
+
+def slot_dir():
+    """ Where lock files and results are kept. """
+    return cache.cache_dir('inflight')
+
+def fresh_result(slot_file):
+    """ Return the result stored in slot_file if it is recent, else None. """
+    try:
+        if time.time() - os.stat(slot_file).st_mtime > RESULT_TTL:
+            return None
+    except OSError:
+        return None
+    return cache.load_json(slot_file)
+
+def is_held(lock_file):
+    """ Is a process holding the lock in lock_file? """
+    with open(lock_file, 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            return True
+    return False
+
+def prune(directory):
+    """ Delete old lock and result files, except locks still held. """
+    now = time.time()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if now - os.stat(path).st_mtime > MAX_AGE and \
+                    not (name.endswith('.lock') and is_held(path)):
+                os.remove(path)
+        except (IOError, OSError):
+            pass
+
+class Busy(Exception):
+    """ Report that another process is still running the computation. """
+    pass
+
+class Flight(object):
+    """
+    A computation that carries on after run() has returned, e.g. in a
+    background process. It holds the key’s lock, so that other requests
+    wait for its result instead of starting the computation again.
+    """
+
+    def __init__(self, slot_file, lock):
+        self.slot_file = slot_file
+        self.lock = lock
+
+    def finish(self, value):
+        """ Share the result and let waiting processes have it. """
+        cache.save_json(self.slot_file, {'value': value})
+        self.close()
+
+    def close(self):
+        """
+        Close this process’s handle on the lock. The lock is released
+        once every process holding it (say, the one that started the
+        computation and the one that finishes it) has closed it.
+        """
+        self.lock.close()
+
+def acquire(lock, timeout):
+    """
+    Take an exclusive lock on an open file, waiting up to timeout
+    seconds (None: as long as it takes). Returns whether it was taken.
+    """
+    if timeout is None:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return True
+
+    deadline = time.time() + timeout
+    interval = 0.001
+    while True:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except IOError:
+            if time.time() >= deadline:
+                return False
+        time.sleep(min(interval, max(0, deadline - time.time())))
+        interval = min(interval * 2, POLL_INTERVAL)
+
+def run(key, compute, timeout=None, handoff=()):
+    """
+    Return compute(), or the result of an identical computation that
+    another process is running (or just finished).
+
+    key -- identifies the computation, e.g. a hash of its input,
+        config and arguments
+    compute -- a function returning a JSON-serializable result; if it
+        raises, nothing is stored and waiting processes run it themselves
+    timeout -- how long to wait for another process running the same
+        computation before raising Busy (None: as long as it takes)
+    handoff -- exception types compute raises when the computation goes
+        on elsewhere, such as validator.OverBudget. The lock stays held,
+        and the exception gets a flight attribute (a Flight); whoever
+        finishes the computation must call its finish() or close().
+    """
+    directory = slot_dir()
+    slot_file = os.path.join(directory, key + '.json')
+
+    result = fresh_result(slot_file)
+    if result is not None:
+        return result['value']
+
+    lock = open(os.path.join(directory, key + '.lock'), 'a')
+    try:
+        # waits while another process computes the same thing
+        if not acquire(lock, timeout):
+            raise Busy()
+
+        result = fresh_result(slot_file)
+        if result is not None:
+            return result['value']
+
+        try:
+            value = compute()
+        except handoff as err:
+            err.flight = Flight(slot_file, lock)
+            lock = None
+            raise
+        cache.save_json(slot_file, {'value': value})
+    finally:
+        if lock is not None:
+            lock.close()
+
+    prune(directory)
+    return value
@@ -7,9 +7,27 @@ Run ESLint and return structured results.
 
 import os
 import sys
+import time
+import signal
 import subprocess
 import re
-from script_finder import only_scripts
+import compile_cache
+import eslint_resolver
+import ignore_patterns
+import scheduling
+
+RESULT_RE = re.compile(
+    r'^[^:]+\: line (?P<line>\d+), col (?P<character>\d+), ' +
+    r'(?P<code>\w+) - (?P<reason>.+?)(\s\((?P<shortname>[\w\-]+)\))?$'
+)
+# PATH values already computed by get_path, keyed by the inputs they use
+_PATH_CACHE = {}
+# longest wait between checks on a running ESLint, in seconds
+POLL_INTERVAL = 0.02
+# the same, when waiting from another process (see wait_detached)
+DETACHED_POLL_INTERVAL = 0.25
+# ESLint is killed after this many seconds (TM_JAVASCRIPT_ESLINT_TIMEOUT)
+DEFAULT_CEILING = 60
 
 class ValidateError(Exception):
     """ Report a validation error. """
@@ -21,18 +39,181 @@ class ValidateError(Exception):
     def __str__(self):
         return repr(self.message)
 
+class OverBudget(Exception):
+    """
+    Report that ESLint was still running when the latency budget ran
+    out. lint is the RunningLint, which can be finished later, or None
+    if another process is running the same lint.
+    """
+    def __init__(self, lint):
+        super(self.__class__, self).__init__('ESLint is still running')
+        self.lint = lint
+
+class LintCancelled(Exception):
+    """ Report that a lint was stopped because its result is not wanted. """
+    pass
+
+class RunningLint(object):
+    """
+    An ESLint process started by Validator.run. Its input and output go
+    through temporary files, so it never blocks on a pipe and can be
+    left to finish in another process.
+    """
+
+    def __init__(self, process, stdout, stderr, line_offset=0, filename=None):
+        self.process = process
+        self.stdout = stdout
+        self.stderr = stderr
+        self.line_offset = line_offset
+        self.filename = filename
+        self.started = time.time()
+
+    def elapsed(self):
+        """ Seconds since ESLint was started. """
+        return time.time() - self.started
+
+    def wait(self, budget=None, ceiling=None, should_cancel=None):
+        """
+        Wait for ESLint to finish. Raises OverBudget once budget seconds
+        have passed, and kills ESLint and raises ValidateError once
+        ceiling seconds have passed. If should_cancel() becomes true,
+        kills ESLint and raises LintCancelled.
+        """
+        interval = 0.001
+        while not self.done():
+            if should_cancel and should_cancel():
+                self.kill()
+                raise LintCancelled()
+            self.check_limits(budget, ceiling)
+            time.sleep(interval)
+            interval = min(interval * 2, POLL_INTERVAL)
+
+    def done(self):
+        """ Has ESLint finished? """
+        return self.process.poll() is not None
+
+    def wait_detached(self, ceiling=None):
+        """
+        Wait for ESLint to finish from a process that did not start it
+        (and so cannot wait on it), such as one made by daemon.detach.
+        """
+        import daemon
+        while daemon.is_running(self.process.pid):
+            self.check_limits(None, ceiling)
+            time.sleep(DETACHED_POLL_INTERVAL)
+
+    def check_limits(self, budget, ceiling):
+        """ Enforce the budget and ceiling; see wait(). """
+        elapsed = self.elapsed()
+        if ceiling and elapsed >= ceiling:
+            self.kill()
+            raise ValidateError(
+                'ESLint was stopped after running for %d seconds.' % ceiling)
+        if budget and elapsed >= budget:
+            raise OverBudget(self)
+
+    def demote(self):
+        """ Lower ESLint’s priority, e.g. once nobody is waiting on it. """
+        scheduling.demote(self.process.pid)
+
+    def kill(self):
+        """ Stop ESLint. """
+        try:
+            os.kill(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        if self.process.poll() is None:
+            try:
+                self.process.wait()
+            except OSError:
+                pass
+
+    def raw_result(self):
+        """
+        Return ESLint’s JSON result for the input (a dict with messages
+        and, when fixing, output). Call once ESLint has finished.
+        """
+        self.stderr.seek(0)
+        message = self.stderr.read()
+        if message:
+            raise ValidateError(message)
+
+        self.stdout.seek(0)
+        return Validator.parse_json_output(self.stdout.read())
+
+    def result(self):
+        """ Return the issues ESLint found. Call once ESLint has finished. """
+        return Validator.parse_json_messages(
+            self.raw_result().get('messages', []), self.line_offset, self.filename)
+
+class WorkerLint(RunningLint):
+    """
+    A lint sent to a warm ESLint worker (see worker_pool.py). It is
+    waited on and finished like a RunningLint, but the worker is shared:
+    stopping the lint only disconnects from it.
+    """
+
+    def __init__(self, pool, key, sock, line_offset=0, filename=None):
+        super(WorkerLint, self).__init__(None, None, None, line_offset, filename)
+        self.pool = pool
+        self.key = key
+        self.sock = sock
+
+    def done(self):
+        """ Has the worker answered? """
+        import select
+        return bool(select.select([self.sock], [], [], 0)[0])
+
+    def wait_detached(self, ceiling=None):
+        """ Wait for the worker from a process made by daemon.detach. """
+        while not self.done():
+            self.check_limits(None, ceiling)
+            time.sleep(DETACHED_POLL_INTERVAL)
+
+    def demote(self):
+        """
+        The worker serves the editor’s other lints; leave its priority
+        alone. (Background work never uses workers.)
+        """
+        pass
+
+    def kill(self):
+        """ Stop waiting for the worker. """
+        self.sock.close()
+
+    def raw_result(self):
+        """ Return the worker’s result for the input. """
+        import worker_pool
+        try:
+            answer = worker_pool.read_answer(self.sock)
+        except (worker_pool.WorkerError, IOError) as err:
+            self.pool.discard(self.key)
+            raise ValidateError(str(err))
+        finally:
+            self.sock.close()
+
+        self.pool.finished(self.key, answer.get('rss', 0))
+        if 'error' in answer:
+            raise ValidateError(answer['error'])
+        results = answer.get('results')
+        return results[0] if results else {}
+
 class Validator(object):
     """
     Run ESLint and return structured results.
     """
 
-    def __init__(self, eslint_command='eslint'):
+    def __init__(self, eslint_command='eslint', background=False):
         """
         Initialize a new Validator.
 
         eslint_command -- the eslint command to run
+        background -- run ESLint at a lower CPU and I/O priority
         """
         self.eslint_command = eslint_command
+        self.background = background
+        # file config fingerprints for workers, made when first needed
+        self._config_deps = None
 
 
     def fix(self, filename, cwd):
@@ -43,10 +224,11 @@ class Validator(object):
         env['PATH'] = Validator.get_path()
 
         args = [
-            self.eslint_command,
+            self.resolve_command(os.path.dirname(filename), env['PATH'], cwd),
             '--fix',
             filename
         ]
+        compile_cache.apply(env, args[0])
 
         try:
             subprocess.call(args, env=env, cwd=cwd)
@@ -54,8 +236,66 @@ class Validator(object):
             raise ValidateError(err.__str__(), env['PATH'])
 
 
-    def run(self, input_iterable=sys.stdin, filename=None, input_is_html=False,
-            line_offset=0, cwd=None):
+    def fix_text(self, input_iterable=None, filename=None, cwd=None):
+        """
+        Fix code without touching the file on disk, using eslint
+        --fix-dry-run. Returns (output, messages): the fixed code, or
+        None if nothing was fixed, and ESLint’s JSON messages for the
+        problems that remain.
+
+        input_iterable -- the code to fix (default: stdin)
+        filename -- if passed, used to find the config and in messages
+        cwd -- the project directory, or the file’s directory if no
+            project is open; used by eslint to find its config
+        """
+        lint = self.start(input_iterable, filename, cwd=cwd, options=['--fix-dry-run'])
+        if lint is None:
+            return None, []
+
+        lint.wait(ceiling=Validator.get_ceiling())
+        result = lint.raw_result()
+        return result.get('output', None), result.get('messages', [])
+
+    def print_config(self, filename, cwd):
+        """
+        Return the configuration ESLint would use for filename, from
+        eslint --print-config.
+        """
+        import json
+
+        env = os.environ.copy()
+        env['PATH'] = Validator.get_path()
+
+        args = [
+            self.resolve_command(os.path.dirname(filename), env['PATH'], cwd),
+            '--print-config',
+            filename
+        ]
+        compile_cache.apply(env, args[0])
+
+        try:
+            eslint = subprocess.Popen(
+                args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,
+                cwd=cwd
+            )
+        except OSError as err:
+            raise ValidateError(err.__str__(), env['PATH'])
+
+        (stdout, stderr) = eslint.communicate()
+
+        if eslint.returncode != 0:
+            raise ValidateError(stderr or stdout)
+        try:
+            return json.loads(stdout)
+        except ValueError:
+            raise ValidateError(stdout)
+
+    def run(self, input_iterable=None, filename=None, input_is_html=False,
+            line_offset=0, cwd=None, options=None, budget=None, ceiling=None,
+            should_cancel=None):
         """
         Run the validator.
 
@@ -67,45 +307,225 @@ class Validator(object):
             this is used to correct the line numbers
         cwd -- the project directory, or the file’s directory if no
             project is open; used by eslint to find its config
+        options -- extra ESLint options, such as those that select a
+            rule profile (see lint_profiles.py)
+        budget -- if ESLint takes longer than this many seconds, raise
+            OverBudget, leaving it running
+        ceiling -- if ESLint takes longer than this many seconds, kill
+            it and raise ValidateError (default: get_ceiling())
+        should_cancel -- a function polled while ESLint runs; if it
+            returns true, ESLint is killed and LintCancelled raised
+        """
+        lint = self.start(input_iterable, filename, input_is_html, line_offset, cwd, options)
+        if lint is None:
+            return []
+
+        lint.wait(budget, Validator.get_ceiling() if ceiling is None else ceiling, should_cancel)
+        return lint.result()
+
+    def start(self, input_iterable=None, filename=None, input_is_html=False,
+              line_offset=0, cwd=None, options=None):
+        """
+        Start validating and return right away. Takes the same arguments
+        as run(); returns a RunningLint (poll it with done(), stop it
+        with kill(), then call result()), or None if ESLint ignores the
+        file.
+        """
+        if Validator.is_ignored(filename, cwd):
+            return None
+
+        import tempfile
+        text = Validator.prepare_input(input_iterable, input_is_html)
+        # JSON output says which problems ESLint can fix
+        options = ['-f', 'json'] + (options or [])
+
+        lint = self._start_in_worker(text, filename, cwd, options, line_offset)
+        if lint is None:
+            stdin = tempfile.TemporaryFile()
+            stdin.write(text if isinstance(text, bytes) else text.encode('utf-8'))
+            stdin.seek(0)
+            stdout = tempfile.TemporaryFile()
+            stderr = tempfile.TemporaryFile()
+
+            eslint = self._spawn(
+                filename, cwd, stderr=stderr, options=options,
+                stdin=stdin, stdout=stdout
+            )
+            stdin.close()
+            lint = RunningLint(eslint, stdout, stderr, line_offset, filename)
+        return lint
+
+    def iter_run(self, input_iterable=None, filename=None, input_is_html=False,
+                 line_offset=0, cwd=None):
+        """
+        Run the validator, yielding each issue as soon as ESLint reports
+        it. Takes the same arguments as run().
+        """
+        if Validator.is_ignored(filename, cwd):
+            return
+
+        import tempfile
+        # stderr goes to a file so it can’t fill up and block ESLint
+        # while we are reading stdout
+        stderr = tempfile.TemporaryFile()
+        eslint = self._spawn(filename, cwd, stderr=stderr)
+        text = Validator.prepare_input(input_iterable, input_is_html)
+
+        eslint.stdin.write(text if isinstance(text, bytes) else text.encode('utf-8'))
+        eslint.stdin.close()
+
+        for line in iter(eslint.stdout.readline, b''):
+            issue = Validator.parse_line(line.decode('utf-8', 'replace'), line_offset, filename)
+            if issue:
+                yield issue
+
+        eslint.wait()
+        stderr.seek(0)
+        message = stderr.read()
+        stderr.close()
+
+        if message:
+            raise ValidateError(message.decode('utf-8', 'replace'))
+
+    def resolve_command(self, start_dir, path_value, cwd=None):
+        """
+        Return the absolute path of the ESLint to run for files in
+        start_dir, from cwd, so the OS does not have to search PATH.
+        """
+        return eslint_resolver.resolve(self.eslint_command, start_dir, path_value, cwd)
+
+    @classmethod
+    def get_ceiling(cls):
+        """
+        How many seconds ESLint may run before it is killed, from
+        TM_JAVASCRIPT_ESLINT_TIMEOUT; 0 means no limit.
         """
+        try:
+            return float(os.environ.get('TM_JAVASCRIPT_ESLINT_TIMEOUT', DEFAULT_CEILING))
+        except ValueError:
+            return DEFAULT_CEILING
 
+    @classmethod
+    def is_ignored(cls, filename, cwd):
+        """
+        Is filename matched by the project’s ignore patterns? ESLint
+        would only report that the file is ignored, so there is no need
+        to start it.
+        """
+        return filename is not None and ignore_patterns.is_ignored(filename, cwd)
+
+    def _environment(self, filename, cwd):
+        """
+        Return (environment, ESLint executable) for running ESLint on
+        filename.
+        """
         env = os.environ.copy()
         env['PATH'] = Validator.get_path()
 
-        args = [
-            self.eslint_command,
-            '-f',
-            'compact',
-            '--no-color',
-            '--stdin'
-        ]
+        start_dir = cwd
+        if filename:
+            start_dir = os.path.dirname(os.path.join(cwd or os.getcwd(), filename))
+
+        command = self.resolve_command(start_dir, env['PATH'], cwd)
+        compile_cache.apply(env, command)
+        return env, command
+
+    def _start_in_worker(self, text, filename, cwd, options, line_offset=0):
+        """
+        Send text to a warm ESLint worker, if workers are turned on and
+        can handle this lint. Returns a WorkerLint, or None to run ESLint
+        directly.
+
+        Background lints always run ESLint directly, at low priority and
+        side by side: a worker runs one lint at a time, at the priority
+        the editor needs, and a save must not queue behind a project run.
+        """
+        import worker_pool
+        if self.background or not worker_pool.is_enabled():
+            return None
+
+        request = worker_pool.request_options(options)
+        if request is None:
+            return None
+
+        env, command = self._environment(filename, cwd)
+        package_dir = worker_pool.eslint_package(command)
+        node_command = eslint_resolver.which('node', env['PATH'])
+        if not package_dir or not node_command:
+            return None
+
+        import socket
+        import config_deps
+        project_dir = os.path.abspath(cwd or os.getcwd())
+        if self._config_deps is None:
+            self._config_deps = config_deps.ConfigDependencies(self.eslint_command)
+        path = None
+        if filename:
+            path = os.path.join(project_dir, filename)
+            request['config'] = self._config_deps.fingerprint(path)
+        packages = self._config_deps.package_fingerprint(
+            path or os.path.join(project_dir, 'file.js'))
+
+        request['cwd'] = project_dir
+        request['filePath'] = path
+        request['text'] = text.decode('utf-8') if isinstance(text, bytes) else text
+
+        pool = worker_pool.WorkerPool()
+        try:
+            key, sock = pool.connect(project_dir, package_dir, node_command, env, packages)
+        except worker_pool.WorkerError:
+            return None
+        try:
+            worker_pool.send_request(sock, request)
+        except socket.error:
+            sock.close()
+            pool.discard(key)
+            return None
+        return WorkerLint(pool, key, sock, line_offset, filename)
+
+    def _spawn(self, filename, cwd, stderr, options=None,
+               stdin=subprocess.PIPE, stdout=subprocess.PIPE):
+        """
+        Start ESLint, reading the code to check from stdin. options
+        replaces the default output format options.
+        """
+        env, command = self._environment(filename, cwd)
+
+        args = [command]
+        args.extend(options or ['-f', 'compact'])
+        args.extend(['--no-color', '--stdin'])
 
         # if we know the filename, pass it
         if filename:
             args.append('--stdin-filename')
             args.append(os.path.relpath(filename, cwd))
 
+        preexec_fn = None
+        if self.background:
+            preexec_fn = scheduling.background_preexec()
+
         try:
-            eslint = subprocess.Popen(
+            return subprocess.Popen(
                 args,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stdin=stdin,
+                stdout=stdout,
+                stderr=stderr,
                 env=env,
-                cwd=cwd
+                cwd=cwd,
+                preexec_fn=preexec_fn
             )
         except OSError as err:
-            raise ValidateError(err.message, env['PATH'])
+            raise ValidateError(err.__str__(), env['PATH'])
 
+    @classmethod
+    def prepare_input(cls, input_iterable=None, input_is_html=False):
+        """ Return the text to send to ESLint. """
+        if input_iterable is None:
+            input_iterable = sys.stdin
         if input_is_html:
+            from script_finder import only_scripts
             input_iterable = only_scripts(input_iterable)
-
-        (stdout, stderr) = eslint.communicate(''.join(input_iterable))
-
-        if stderr:
-            raise ValidateError(stderr)
-
-        return Validator.parse_results(stdout, line_offset, filename)
+        return ''.join(input_iterable)
 
     @classmethod
     def parse_results(cls, results, line_offset=0, filename=None):
@@ -113,62 +533,107 @@ class Validator(object):
         Parse the stdout after running ESLint. Returns a list of
         detected issues.
         """
-        rxp = re.compile(
-            r'^[^:]+\: line (?P<line>\d+), col (?P<character>\d+), ' +
-            r'(?P<code>\w+) - (?P<reason>.+?)(\s\((?P<shortname>[\w\-]+)\))?$'
-        )
-
         issues = []
 
         for line in results.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
+            issue = Validator.parse_line(line, line_offset, filename)
+            if issue:
+                issues.append(issue)
 
-            match = rxp.match(line)
+        return issues
 
-            if not match:
-                continue
+    @classmethod
+    def parse_line(cls, line, line_offset=0, filename=None):
+        """
+        Parse one line of ESLint output. Returns the issue it describes,
+        or None if the line is not an issue.
+        """
+        match = RESULT_RE.match(line.strip())
 
-            issue = {
-                'isError': match.group('code')[0] == 'E',
-                'isWarning': match.group('code')[0] == 'W',
-                'line': int(match.group('line')),
-                'character': int(match.group('character')) + 1,
-                'reason': match.group('reason')
-            }
+        if not match:
+            return None
 
-            if match.group('shortname'):
-                issue['shortname'] = match.group('shortname')
+        issue = {
+            'isError': match.group('code')[0] == 'E',
+            'isWarning': match.group('code')[0] == 'W',
+            'line': int(match.group('line')) + line_offset,
+            'character': int(match.group('character')) + 1,
+            'reason': match.group('reason')
+        }
 
-            issues.append(issue)
+        if match.group('shortname'):
+            issue['shortname'] = match.group('shortname')
 
-        # normalize line numbers
-        for issue in issues:
-            issue['line'] += line_offset
+        Validator.add_url(issue, filename)
+        return issue
 
+    @classmethod
+    def parse_json_output(cls, output):
+        """
+        Parse ESLint’s JSON output for a single input. Returns the result
+        for that input (a dict with messages and, when fixing, output).
+        """
+        import json
+        try:
+            results = json.loads(output)
+        except ValueError:
+            raise ValidateError(output)
+        return results[0] if results else {}
 
-        # add URLs to the issues
-        if filename:
-            url_maker = lambda x: \
-                'txmt://open?url=file://%s&line=%d&column=%d' % \
-                (filename, x['line'], x['character'])
-        else:
-            url_maker = lambda x: \
-                'txmt://open?line=%d&column=%d' % (x['line'], x['character'])
+    @classmethod
+    def parse_json_messages(cls, messages, line_offset=0, filename=None):
+        """
+        Convert the messages from ESLint’s JSON output to issues like
+        those parse_line returns, plus whether ESLint can fix each one.
+        """
+        issues = []
 
-        for issue in issues:
-            issue['url'] = url_maker(issue)
+        for message in messages:
+            issue = {
+                'isError': message.get('fatal', False) or message.get('severity') == 2,
+                'isWarning': message.get('severity') == 1,
+                'line': (message.get('line') or 0) + line_offset,
+                'character': (message.get('column') or 0) + 1,
+                'reason': message.get('message', ''),
+                'fixable': 'fix' in message
+            }
+            if message.get('ruleId'):
+                issue['shortname'] = message['ruleId']
+
+            Validator.add_url(issue, filename)
+            issues.append(issue)
 
         return issues
 
+    @classmethod
+    def add_url(cls, issue, filename=None):
+        """ Add a URL that opens the issue’s location to an issue. """
+        if filename:
+            issue['url'] = 'txmt://open?url=file://%s&line=%d&column=%d' % \
+                (filename, issue['line'], issue['character'])
+        else:
+            issue['url'] = 'txmt://open?line=%d&column=%d' % \
+                (issue['line'], issue['character'])
+
     @classmethod
     def get_path(cls):
         """ Return the value to be used as the PATH setting. """
+        cache_key = (
+            os.environ.get('PATH', ''),
+            os.environ.get('NODE_PATH', None),
+            os.environ.get('TM_PROJECT_DIRECTORY', None)
+        )
+        if cache_key not in _PATH_CACHE:
+            _PATH_CACHE[cache_key] = cls._build_path()
+        return _PATH_CACHE[cache_key]
+
+    @classmethod
+    def _build_path(cls):
+        """ Build the PATH setting from the current environment. """
         # ESLint (and Node) are often installed to /usr/local/bin,
         # which may not be on the bundle’s PATH in a default install
         # of TextMate.
-        path_parts = os.environ.get('PATH', []).split(':')
+        path_parts = os.environ.get('PATH', '').split(':')
 
         node_path = os.environ.get('NODE_PATH', None)
         if node_path:
@@ -189,3 +654,73 @@ class Validator(object):
             path_parts.append('/usr/local/bin')
 
         return ':'.join(path_parts)
+
+def run_many(starts, concurrency, ceiling=None, should_cancel=None):
+    """
+    Run many lints from one process, at most concurrency of them at a
+    time, yielding (key, issues, error_message) for each as it finishes.
+
+    starts -- an iterable of (key, start): start() begins a lint and
+        returns what Validator.start returns; it is only called once
+        there is room, so there are never more than concurrency ESLint
+        processes and open files
+    ceiling -- kill any lint running longer than this many seconds
+        (default: Validator.get_ceiling())
+    should_cancel -- a function polled while lints run; if it returns
+        true, every running lint is killed and LintCancelled raised
+    """
+    if ceiling is None:
+        ceiling = Validator.get_ceiling()
+    starts = iter(starts)
+    running = []
+    interval = 0.001
+
+    try:
+        while True:
+            while len(running) < concurrency:
+                try:
+                    key, start = next(starts)
+                except StopIteration:
+                    break
+                try:
+                    lint = start()
+                except ValidateError as err:
+                    yield key, [], err.message
+                    continue
+                except EnvironmentError as err:
+                    yield key, [], err.strerror
+                    continue
+                if lint is None:
+                    yield key, [], None
+                else:
+                    running.append((key, lint))
+
+            if not running:
+                return
+            if should_cancel and should_cancel():
+                raise LintCancelled()
+
+            still_running = []
+            finished = []
+            for key, lint in running:
+                try:
+                    if lint.done():
+                        finished.append((key, lint.result(), None))
+                    else:
+                        lint.check_limits(None, ceiling)
+                        still_running.append((key, lint))
+                except ValidateError as err:
+                    finished.append((key, [], err.message))
+            running = still_running
+
+            for result in finished:
+                yield result
+            if finished:
+                interval = 0.001
+            else:
+                time.sleep(interval)
+                interval = min(interval * 2, POLL_INTERVAL)
+    finally:
+        # the caller stopped early, or the lints were cancelled
+        for _, lint in running:
+            lint.kill()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Keep a cached copy of the latest released bundle version so reports
+can show whether an update is available without going to the network.
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+import cache
+
+VERSION = '3.0.2'
+LATEST_URL = 'https://raw.githubusercontent.com/natesilva/javascript-eslint.tmbundle/master/latest.json'
+CACHE_TTL = 24 * 60 * 60
+
+def get_cache_file():
+    """ Where the cached latest.json data is kept. """
+    return os.path.join(cache.cache_dir(), 'latest.json')
+
+def get_latest_url():
+    """
+    The URL to check for the latest version. Set
+    TM_JAVASCRIPT_ESLINT_LATEST_URL to a file:// URL to use a local
+    stand-in for latest.json.
+    """
+    return os.environ.get('TM_JAVASCRIPT_ESLINT_LATEST_URL', LATEST_URL)
+
+def parse_version(ver):
+    """ Parse a version number into a tuple of ints, or None. """
+    try:
+        parts = tuple(int(part) for part in ver.split('.'))
+    except (AttributeError, ValueError):
+        return None
+    if len(parts) != 3:
+        return None
+    return parts
+
+def is_newer(current, target):
+    """ Return True if version target is newer than version current. """
+    current_parts = parse_version(current)
+    target_parts = parse_version(target)
+    if current_parts is None or target_parts is None:
+        return False
+    return target_parts > current_parts
+
+def is_stale(data):
+    """ Does the cached data need to be refreshed? """
+    if not data or 'checked' not in data:
+        return True
+    return time.time() - data['checked'] > CACHE_TTL
+
+def get_status():
+    """
+    Return the cached update status as report template context. Never
+    touches the network.
+    """
+    context = {'versionNumber': VERSION}
+
+    data = cache.load_json(get_cache_file())
+    if data and data.get('latest'):
+        context['updateChecked'] = True
+        context['latestVersion'] = data['latest']
+        context['updateAvailable'] = is_newer(VERSION, data['latest'])
+
+    return context
+
+def refresh():
+    """ Fetch latest.json and update the cache file. """
+    try:
+        from urllib2 import urlopen
+    except ImportError:
+        from urllib.request import urlopen
+
+    cache_file = get_cache_file()
+    data = cache.load_json(cache_file, {})
+    try:
+        response = urlopen(get_latest_url(), timeout=10)
+        latest = json.loads(response.read().decode('utf-8'))['latest']
+    except Exception:   # pylint: disable=broad-except
+        # try again later, but not on every save
+        data['checked'] = time.time()
+        cache.save_json(cache_file, data)
+        return
+
+    cache.save_json(cache_file, {'checked': time.time(), 'latest': latest})
+
+def refresh_in_background():
+    """
+    If the cached data is stale, start a detached process to refresh
+    it. Returns immediately.
+    """
+    cache_file = get_cache_file()
+    data = cache.load_json(cache_file, {})
+    if not is_stale(data):
+        return
+
+    # mark it as checked now so concurrent saves don’t pile up fetches
+    data['checked'] = time.time()
+    cache.save_json(cache_file, data)
+
+    devnull = open(os.devnull, 'r+')
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--refresh'],
+            stdin=devnull,
+            stdout=devnull,
+            stderr=devnull,
+            close_fds=True
+        )
+    except OSError:
+        pass
+    finally:
+        devnull.close()
+
+
+if __name__ == '__main__':
+    if '--refresh' in sys.argv:
+        refresh()
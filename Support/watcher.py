@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+An optional background process that watches a project and re-lints
+files as they change, so results are ready before they are asked for.
+
+Results go into the project index (project_index.py), where quiet()
+and full_report() use them if the buffer’s content hash matches, and
+into the issue database.
+
+Changes are detected with inotify on Linux and by polling file
+modification times elsewhere. Besides the project’s own files, the
+package.json of each ESLint package in the top-level node_modules is
+watched, so plugin upgrades are noticed. The watcher exits when no file
+in the project has been saved for IDLE_TIMEOUT seconds.
+
+    python watcher.py start PROJECT_DIR     start in the background
+    python watcher.py stop PROJECT_DIR      stop a running watcher
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import batch
+import cache
+import config_deps
+import daemon
+import project_index
+
+DEBOUNCE = 0.5
+# re-lint after this many seconds even if changes keep coming
+MAX_DELAY = 5.0
+POLL_INTERVAL = 2.0
+NICENESS = 10
+# exit after this many seconds without a save in the project
+IDLE_TIMEOUT = 30 * 60
+
+def get_pid_file(project_dir):
+    """ Where the watcher for a project records its process id. """
+    return os.path.join(
+        cache.cache_dir('projects', cache.key_for(os.path.abspath(project_dir))),
+        'watcher.pid'
+    )
+
+def get_activity_file(project_dir):
+    """ A file touched whenever a file in the project is saved. """
+    return os.path.join(os.path.dirname(get_pid_file(project_dir)), 'watcher.active')
+
+def is_idle(project_dir):
+    """ Has the project gone IDLE_TIMEOUT seconds without a save? """
+    try:
+        return time.time() - os.stat(get_activity_file(project_dir)).st_mtime > IDLE_TIMEOUT
+    except OSError:
+        return True
+
+def is_running(project_dir):
+    """ Is a watcher running for this project? """
+    return daemon.read_pid(get_pid_file(project_dir)) is not None
+
+def wanted_dirs(top):
+    """ Yield top and every directory below it that batch would search. """
+    for dirpath, dirnames, _ in os.walk(top):
+        dirnames[:] = [
+            d for d in dirnames
+            if not d.startswith('.') and d not in batch.SKIP_DIRS
+        ]
+        yield dirpath
+
+def package_dirs(top):
+    """
+    Yield top/node_modules, its @scope directories and the ESLint
+    packages in them; packages installed further down are not watched.
+    """
+    modules = os.path.join(top, 'node_modules')
+    try:
+        names = sorted(os.listdir(modules))
+    except OSError:
+        return
+    yield modules
+    for name in names:
+        path = os.path.join(modules, name)
+        if name.startswith('@'):
+            try:
+                scoped = sorted(os.listdir(path))
+            except OSError:
+                continue
+            yield path
+            for package in scoped:
+                if config_deps.is_eslint_package(name + '/' + package):
+                    yield os.path.join(path, package)
+        elif config_deps.is_eslint_package(name):
+            yield path
+
+class InotifyWatcher(object):
+    """ Report changed paths using Linux inotify, through ctypes. """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | \
+        IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, project_dir):
+        import ctypes
+        import ctypes.util
+
+        self.project_dir = project_dir
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}
+        # watches in node_modules, where only package.json matters
+        self.package_watches = set()
+        self.add_tree(project_dir)
+        self.add_packages()
+
+    @classmethod
+    def is_supported(cls):
+        """ Is inotify available on this system? """
+        return sys.platform.startswith('linux')
+
+    def add_tree(self, top):
+        """ Watch top and the directories below it. """
+        for dirpath in wanted_dirs(top):
+            path = dirpath.encode('utf-8') if not isinstance(dirpath, bytes) else dirpath
+            wd = self.libc.inotify_add_watch(self.fd, path, self.MASK)
+            if wd >= 0:
+                self.watches[wd] = dirpath
+
+    def add_package_dir(self, dirpath):
+        """ Watch a directory in node_modules. Returns True if it is new. """
+        path = dirpath.encode('utf-8') if not isinstance(dirpath, bytes) else dirpath
+        wd = self.libc.inotify_add_watch(self.fd, path, self.MASK)
+        if wd < 0 or wd in self.package_watches:
+            return False
+        self.watches[wd] = dirpath
+        self.package_watches.add(wd)
+        return True
+
+    def add_packages(self):
+        """
+        Watch the ESLint packages in the top-level node_modules. Returns
+        the package.json paths of those not watched before.
+        """
+        found = []
+        for dirpath in package_dirs(self.project_dir):
+            package = config_deps.package_of(dirpath)[1]
+            if self.add_package_dir(dirpath) and package and \
+                    config_deps.is_eslint_package(package) and \
+                    not os.path.basename(dirpath).startswith('@'):
+                found.append(os.path.join(dirpath, 'package.json'))
+        return found
+
+    def package_changed(self, path, mask):
+        """
+        Handle a directory created, moved or deleted in node_modules, or
+        node_modules itself. Returns the package.json paths of the ESLint
+        packages that changed; other packages don’t matter.
+        """
+        added = mask & (self.IN_CREATE | self.IN_MOVED_TO)
+        if path == os.path.join(self.project_dir, 'node_modules'):
+            return self.add_packages() if added else []
+
+        package = config_deps.package_of(path)[1]
+        if not package:
+            return []
+        if '/' not in package and package.startswith('@'):
+            if not added:
+                return []
+            # a new scope: watch it and the ESLint packages in it
+            self.add_package_dir(path)
+            found = []
+            try:
+                names = sorted(os.listdir(path))
+            except OSError:
+                return []
+            for name in names:
+                if config_deps.is_eslint_package(package + '/' + name):
+                    self.add_package_dir(os.path.join(path, name))
+                    found.append(os.path.join(path, name, 'package.json'))
+            return found
+        if not config_deps.is_eslint_package(package):
+            return []
+        if added:
+            self.add_package_dir(path)
+        return [os.path.join(path, 'package.json')]
+
+    def changes(self, timeout):
+        """ Wait up to timeout seconds and return the set of changed paths. """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                # events were lost; treat everything as changed
+                changed.update(batch.expand_paths([self.project_dir]))
+                continue
+
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+
+            if wd in self.package_watches or \
+                    (directory == self.project_dir and name == 'node_modules'):
+                if mask & self.IN_ISDIR:
+                    changed.update(self.package_changed(path, mask))
+                elif name == 'package.json':
+                    changed.add(path)
+                continue
+
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO) and \
+                        not name.startswith('.') and name not in batch.SKIP_DIRS:
+                    self.add_tree(path)
+                    changed.update(batch.expand_paths([path]))
+                continue
+
+            changed.add(path)
+        return changed
+
+class PollingWatcher(object):
+    """ Report changed paths by comparing file modification times. """
+
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        """ Return {path: (mtime, size)} for every file we care about. """
+        snapshot = {}
+        for dirpath in wanted_dirs(self.project_dir):
+            for name in os.listdir(dirpath):
+                if batch.is_validatable(name) or config_deps.is_config_file(name):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_mtime, stat.st_size)
+        for dirpath in package_dirs(self.project_dir):
+            path = os.path.join(dirpath, 'package.json')
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout):
+        """ Wait up to timeout seconds and return the set of changed paths. """
+        time.sleep(min(timeout, POLL_INTERVAL))
+        snapshot = self.take_snapshot()
+        changed = set(
+            path for path in set(snapshot) | set(self.snapshot)
+            if snapshot.get(path) != self.snapshot.get(path)
+        )
+        self.snapshot = snapshot
+        return changed
+
+def files_to_relint(changed):
+    """
+    Turn a set of changed paths into the files to validate. A changed
+    config file means every file below its directory is affected.
+    """
+    files = set()
+    for path in changed:
+        subtree = config_deps.affected_dir(path)
+        if subtree:
+            files.update(batch.expand_paths([subtree]))
+        elif batch.is_validatable(path) and os.path.isfile(path):
+            files.add(path)
+    return sorted(files)
+
+def relint(project_dir, eslint_command, changed):
+    """ Validate changed files and store the results. """
+    import issue_db
+
+    index = project_index.ProjectIndex(project_dir, eslint_command)
+    index.invalidate(changed)
+    stale = []
+    signatures = {}
+    for filename in files_to_relint(changed):
+        try:
+            issues, signatures[filename] = index.check(filename)
+        except (IOError, OSError):
+            continue
+        if issues is None:
+            stale.append(filename)
+
+    if not stale:
+        return
+
+    results = batch.validate_files(stale, eslint_command, project_dir)
+    for filename, issues, error_message in results:
+        if not error_message:
+            index.store(filename, signatures[filename], issues)
+    index.save()
+
+    database = issue_db.IssueDatabase(project_dir)
+    try:
+        database.record([
+            (filename, issues, signatures[filename]['hash'])
+            for filename, issues, error_message in results if not error_message
+        ])
+    finally:
+        database.close()
+
+def watch(project_dir, eslint_command):
+    """
+    Watch the project, re-linting changed files, until it is deleted or
+    goes unused (see is_idle).
+    """
+    os.nice(NICENESS)
+
+    if InotifyWatcher.is_supported():
+        watcher = InotifyWatcher(project_dir)
+    else:
+        watcher = PollingWatcher(project_dir)
+
+    pending = set()
+    first_change = None
+    while os.path.isdir(project_dir) and not is_idle(project_dir):
+        changed = watcher.changes(DEBOUNCE if pending else POLL_INTERVAL)
+        if changed:
+            if not pending:
+                first_change = time.time()
+            pending.update(changed)
+            # wait for the burst of changes to settle, but not forever
+            if time.time() - first_change < MAX_DELAY:
+                continue
+        if pending:
+            relint(project_dir, eslint_command, pending)
+            pending = set()
+
+def start(project_dir):
+    """
+    Start a watcher for the project in the background, or keep the
+    running one from going idle. Called on every save.
+    """
+    project_dir = os.path.abspath(project_dir)
+    cache.save_text(get_activity_file(project_dir), '')
+    if is_running(project_dir):
+        return
+    eslint_command = os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint')
+    if not daemon.detach():
+        return
+
+    pid_file = get_pid_file(project_dir)
+    cache.save_text(pid_file, str(os.getpid()))
+    try:
+        watch(project_dir, eslint_command)
+    finally:
+        daemon.remove_quietly(pid_file)
+        os._exit(0)
+
+def stop(project_dir):
+    """ Stop the watcher for a project. """
+    daemon.stop(get_pid_file(os.path.abspath(project_dir)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] not in ('start', 'stop'):
+        sys.exit('usage: watcher.py start|stop PROJECT_DIR')
+    if sys.argv[1] == 'start':
+        start(sys.argv[2])
+    else:
+        stop(sys.argv[2])
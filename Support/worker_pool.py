@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Keep warm ESLint workers for the projects in use, so that validating
+doesn’t start Node and load ESLint every time. There is one worker
+(eslint_worker.js) per project directory and ESLint install; workers
+are shared by all the bundle’s processes through a registry file.
+
+Before a worker is started, the least recently used workers are
+stopped until there is room for it under TM_JAVASCRIPT_ESLINT_MAX_WORKERS
+workers and TM_JAVASCRIPT_ESLINT_WORKERS_MEMORY megabytes in all. A
+worker that grows past RECYCLE_MEMORY is stopped after its request and
+started fresh the next time it is needed. Idle workers exit on their
+own.
+
+Workers are used when TM_JAVASCRIPT_ESLINT_WORKERS is 1, for lints of
+the current document only: background work (project, selection and
+watcher runs) starts its own low-priority ESLint processes, so it runs
+in parallel and a save never waits behind it. Anything workers can’t
+do (an ESLint that isn’t a Node package, unusual options, a worker that
+fails to start) falls back to running ESLint directly.
+"""
+
+import os
+import json
+import time
+import fcntl
+import signal
+import socket
+import cache
+import daemon
+import scheduling
+
+THIS_DIR = os.path.abspath(os.path.dirname(__file__))
+WORKER_SCRIPT = os.path.join(THIS_DIR, 'eslint_worker.js')
+
+DEFAULT_MAX_WORKERS = 4
+# megabytes, for all workers together
+DEFAULT_MEMORY = 1024
+# a worker using more memory than this is replaced
+RECYCLE_MEMORY = 512 * 1024 * 1024
+# workers exit after this many seconds without a request
+IDLE_TIMEOUT = 15 * 60
+# how long to wait for a new worker to start listening
+START_TIMEOUT = 10
+START_POLL_INTERVAL = 0.02
+
+class WorkerError(Exception):
+    """ Report that a worker could not be used. """
+    pass
+
+def is_enabled():
+    """ Should ESLint run in warm workers? """
+    return os.environ.get('TM_JAVASCRIPT_ESLINT_WORKERS', '0') == '1'
+
+def get_max_workers():
+    """ How many workers may run at once. """
+    try:
+        return max(1, int(os.environ.get('TM_JAVASCRIPT_ESLINT_MAX_WORKERS',
+                                         DEFAULT_MAX_WORKERS)))
+    except ValueError:
+        return DEFAULT_MAX_WORKERS
+
+def get_memory_limit():
+    """ How many bytes of memory all workers together may use. """
+    try:
+        megabytes = float(os.environ.get('TM_JAVASCRIPT_ESLINT_WORKERS_MEMORY',
+                                         DEFAULT_MEMORY))
+    except ValueError:
+        megabytes = DEFAULT_MEMORY
+    return int(megabytes * 1024 * 1024)
+
+def eslint_package(eslint_path):
+    """
+    Return the directory of the ESLint package that eslint_path (an
+    executable such as node_modules/.bin/eslint) runs, or None.
+    """
+    dirname = os.path.dirname(os.path.realpath(eslint_path))
+    # the executable is eslint/bin/eslint.js
+    for package_dir in (dirname, os.path.dirname(dirname)):
+        package = cache.load_json(os.path.join(package_dir, 'package.json'))
+        if isinstance(package, dict) and package.get('name') == 'eslint':
+            return package_dir
+    return None
+
+def request_options(options):
+    """
+    Translate ESLint command-line options (those run() and fix_text()
+    pass) into worker request fields. Returns None if a worker can’t
+    handle them.
+    """
+    fields = {'fix': False, 'quiet': False, 'rules': []}
+    options = list(options or [])
+    while options:
+        option = options.pop(0)
+        if option in ('-f', '--format') and options and options[0] == 'json':
+            options.pop(0)
+        elif option == '--fix-dry-run':
+            fields['fix'] = True
+        elif option == '--quiet':
+            fields['quiet'] = True
+        elif option == '--rule' and options and options[0].endswith(': off'):
+            fields['rules'].append(options.pop(0)[:-len(': off')])
+        else:
+            return None
+    return fields
+
+class WorkerPool(object):
+    """ The warm ESLint workers shared by the bundle’s processes. """
+
+    def __init__(self, directory=None):
+        self.directory = directory or cache.cache_dir('workers')
+        self.registry_file = os.path.join(self.directory, 'workers.json')
+        self.lock_file = os.path.join(self.directory, 'workers.lock')
+
+    def _lock(self):
+        """ Take the registry lock, waiting if needed. Close to release. """
+        lock = open(self.lock_file, 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _load(self):
+        """ Load the registry, forgetting workers that have exited. """
+        registry = cache.load_json(self.registry_file, {})
+        return dict(
+            (key, worker) for key, worker in registry.items()
+            if daemon.is_running(worker['pid'])
+        )
+
+    def connect(self, project_dir, package_dir, node_command, env, packages=''):
+        """
+        Return (key, connected socket) for the worker for project_dir
+        and package_dir, starting it if needed.
+
+        packages -- a fingerprint of the plugins and shared configs the
+            worker will load (config_deps.py); Node can’t reload them,
+            so a worker is never reused once they change
+        """
+        package_json = os.path.join(package_dir, 'package.json')
+        try:
+            installed = os.stat(package_json).st_mtime
+        except OSError:
+            raise WorkerError('%s is missing' % package_json)
+        # reinstalling ESLint or a plugin makes a new key; the old
+        # worker ages out
+        key = cache.key_for('\0'.join([project_dir, package_dir, repr(installed), packages]))
+
+        lock = self._lock()
+        try:
+            registry = self._load()
+            worker = registry.get(key)
+            if worker is None:
+                self._make_room(registry)
+                worker = self._start(key, package_dir, node_command, env)
+                registry[key] = worker
+            worker['used'] = time.time()
+            cache.save_json(self.registry_file, registry)
+        finally:
+            lock.close()
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(worker['socket'])
+        except socket.error as err:
+            sock.close()
+            self.discard(key)
+            raise WorkerError(str(err))
+        return key, sock
+
+    def _make_room(self, registry):
+        """
+        Stop the least recently used workers until another one fits
+        under the worker and memory limits.
+        """
+        max_workers = get_max_workers()
+        memory_limit = get_memory_limit()
+        by_age = sorted(registry, key=lambda key: registry[key]['used'])
+
+        def memory():
+            """ Memory used by the workers, plus an estimate for a new one. """
+            return sum(worker['rss'] for worker in registry.values()) + \
+                scheduling.ESLINT_MEMORY
+
+        while by_age and (len(registry) >= max_workers or memory() > memory_limit):
+            stop_worker(registry.pop(by_age.pop(0)))
+
+    def _start(self, key, package_dir, node_command, env):
+        """ Start a worker and wait for it to listen. """
+        import subprocess
+
+        # socket paths are limited to about 100 bytes
+        socket_path = os.path.join(self.directory, key[:16] + '.sock')
+        daemon.remove_quietly(socket_path)
+
+        with open(os.devnull, 'r+') as devnull:
+            try:
+                process = subprocess.Popen(
+                    [node_command, WORKER_SCRIPT, socket_path, package_dir,
+                     str(IDLE_TIMEOUT)],
+                    stdin=devnull, stdout=devnull, stderr=devnull,
+                    env=env, cwd=THIS_DIR, close_fds=True,
+                    # outlive the command that started it
+                    preexec_fn=os.setsid
+                )
+            except OSError as err:
+                raise WorkerError(str(err))
+
+        started = time.time()
+        while not os.path.exists(socket_path):
+            if process.poll() is not None or time.time() - started > START_TIMEOUT:
+                stop_worker({'pid': process.pid, 'socket': socket_path})
+                raise WorkerError('ESLint worker did not start')
+            time.sleep(START_POLL_INTERVAL)
+
+        return {'pid': process.pid, 'socket': socket_path, 'rss': 0, 'used': started}
+
+    def finished(self, key, rss):
+        """
+        Record how much memory a worker used for its last request, and
+        replace it if it has grown too large.
+        """
+        lock = self._lock()
+        try:
+            registry = self._load()
+            if key in registry:
+                registry[key]['rss'] = rss
+                if rss > RECYCLE_MEMORY:
+                    stop_worker(registry.pop(key))
+                cache.save_json(self.registry_file, registry)
+        finally:
+            lock.close()
+
+    def discard(self, key):
+        """ Stop a worker that is not working. """
+        lock = self._lock()
+        try:
+            registry = self._load()
+            if key in registry:
+                stop_worker(registry.pop(key))
+                cache.save_json(self.registry_file, registry)
+        finally:
+            lock.close()
+
+    def stop_all(self):
+        """ Stop every worker. """
+        lock = self._lock()
+        try:
+            for worker in self._load().values():
+                stop_worker(worker)
+            cache.save_json(self.registry_file, {})
+        finally:
+            lock.close()
+
+def stop_worker(worker):
+    """ Stop a worker process and remove its socket. """
+    try:
+        os.kill(worker['pid'], signal.SIGTERM)
+    except OSError:
+        pass
+    daemon.remove_quietly(worker['socket'])
+
+def send_request(sock, request):
+    """ Send a request to a worker over a connected socket. """
+    sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+def read_answer(sock):
+    """ Read a worker’s whole answer from a socket. """
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    try:
+        return json.loads(b''.join(chunks).decode('utf-8'))
+    except ValueError:
+        raise WorkerError('ESLint worker gave no answer')
+
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:] != ['stop']:
+        sys.exit('usage: worker_pool.py stop')
+    WorkerPool().stop_all()
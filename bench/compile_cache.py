@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare ESLint spawn times without a V8 compile cache (cold) and with
+a primed one (warm). Needs Node 22.1 or later for the cache to have any
+effect.
+
+The ESLint used is found the same way the bundle finds it, starting
+from the directory of the file being validated.
+
+    python bench/compile_cache.py FILE [--eslint ESLINT] [--runs N]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+SUPPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Support')
+sys.path.insert(0, SUPPORT_DIR)
+
+import validator  # noqa: E402
+
+def median(values):
+    """ Return the median of a list of numbers. """
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+def spawn_ms(args, text, env, cwd):
+    """ Run ESLint once on text and return the wall-clock time in ms. """
+    start = time.time()
+    proc = subprocess.Popen(
+        args,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        cwd=cwd
+    )
+    proc.communicate(text)
+    return (time.time() - start) * 1000.0
+
+def main():
+    """ Run the benchmark. """
+    parser = argparse.ArgumentParser(description='Compare cold and warm ESLint spawns.')
+    parser.add_argument('file')
+    parser.add_argument('--eslint', default=os.environ.get('TM_JAVASCRIPT_ESLINT_ESLINT', 'eslint'))
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    filename = os.path.abspath(args.file)
+    cwd = os.path.dirname(filename)
+    with open(filename, 'rb') as infile:
+        text = infile.read()
+
+    env = os.environ.copy()
+    env.pop('NODE_COMPILE_CACHE', None)
+    env['PATH'] = validator.Validator.get_path()
+    eslint = validator.Validator(args.eslint).resolve_command(cwd, env['PATH'])
+    command = [eslint, '-f', 'compact', '--no-color', '--stdin', '--stdin-filename', filename]
+
+    cold = median([spawn_ms(command, text, env, cwd) for _ in range(args.runs)])
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        warm_env = dict(env, NODE_COMPILE_CACHE=cache_dir)
+        # the first run fills the cache
+        spawn_ms(command, text, warm_env, cwd)
+        warm = median([spawn_ms(command, text, warm_env, cwd) for _ in range(args.runs)])
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print('{0}'.format(eslint))
+    print('cold: {0:.1f} ms (median of {1})'.format(cold, args.runs))
+    print('warm: {0:.1f} ms (median of {1})'.format(warm, args.runs))
+    print('saved: {0:.1f} ms ({1:.0f}%)'.format(cold - warm, 100.0 * (cold - warm) / cold))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Check that the validate-on-save path of main.py starts quickly.
+
+Measures how long `import main` takes (using `python -X importtime`
+where the interpreter supports it, wall-clock time otherwise) and how
+long a whole `main --quiet` run takes against a stub ESLint that
+reports nothing, both less interpreter startup. Also checks that the
+template engine and other report-only modules are not imported. Exits
+with status 1 if either budget is exceeded.
+
+    python bench/startup_budget.py [--python PYTHON] [--budget-ms MS]
+        [--quiet-budget-ms MS] [--runs N]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+SUPPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Support')
+DEFAULT_BUDGET_MS = 40.0
+# for main --quiet, including running the stub ESLint and mate
+DEFAULT_QUIET_BUDGET_MS = 60.0
+# modules that only the HTML report needs
+REPORT_ONLY_MODULES = ['ashes', 'render_cache', 'script_finder']
+
+IMPORT_MAIN = 'import sys; sys.path.insert(0, {0!r}); import main'.format(SUPPORT_DIR)
+RUN_QUIET = IMPORT_MAIN + "; main.main(['main.py', '--quiet'])"
+# options that would start background processes or change the save path
+UNSET_OPTIONS = [
+    'TM_JAVASCRIPT_ESLINT_LINT_ON_MODIFY',
+    'TM_JAVASCRIPT_ESLINT_SAVE_BUDGET',
+    'TM_JAVASCRIPT_ESLINT_SAVE_PROFILE',
+    'TM_JAVASCRIPT_ESLINT_SAVE_RULES',
+    'TM_JAVASCRIPT_ESLINT_SERVER',
+    'TM_JAVASCRIPT_ESLINT_WATCH',
+    'TM_JAVASCRIPT_ESLINT_WORKERS'
+]
+
+def median(values):
+    """ Return the median of a list of numbers. """
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+def supports_importtime(python):
+    """ Does the interpreter support -X importtime? """
+    code = 'import sys; sys.exit(0 if sys.version_info >= (3, 7) else 1)'
+    return subprocess.call([python, '-c', code]) == 0
+
+def importtime_ms(python):
+    """ Cumulative import time of main, in ms, as reported by -X importtime. """
+    proc = subprocess.Popen(
+        [python, '-X', 'importtime', '-c', IMPORT_MAIN],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    _, stderr = proc.communicate()
+    for line in stderr.decode('utf-8').splitlines():
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == 'main':
+            return int(parts[1]) / 1000.0
+    raise RuntimeError('main was not imported:\n' + stderr.decode('utf-8'))
+
+def wallclock_ms(python):
+    """ Wall-clock time of importing main, less interpreter startup, in ms. """
+    def timed(code):
+        start = time.time()
+        subprocess.check_call([python, '-c', code])
+        return time.time() - start
+    return (timed(IMPORT_MAIN) - timed('pass')) * 1000.0
+
+def write_script(path, body):
+    """ Write an executable shell script. """
+    with open(path, 'w') as outfile:
+        outfile.write('#!/bin/sh\n' + body + '\n')
+    os.chmod(path, 0o755)
+
+def quiet_environment(directory):
+    """
+    Set up a project, a stub ESLint and a stub mate in directory and
+    return the environment for a save of the project’s one file.
+    """
+    project = os.path.join(directory, 'project')
+    os.mkdir(project)
+    filename = os.path.join(project, 'file.js')
+    with open(filename, 'w') as outfile:
+        outfile.write('var answer = 42;\n')
+    eslint = os.path.join(directory, 'eslint')
+    write_script(eslint, 'cat > /dev/null\necho \'[{"messages": []}]\'')
+    mate = os.path.join(directory, 'mate')
+    write_script(mate, 'exit 0')
+
+    env = dict(os.environ)
+    for name in UNSET_OPTIONS:
+        env.pop(name, None)
+    env.update({
+        'TM_BUNDLE_SUPPORT': os.path.abspath(SUPPORT_DIR),
+        'TM_DIRECTORY': project,
+        'TM_FILEPATH': filename,
+        'TM_MATE': mate,
+        'TM_PROJECT_DIRECTORY': project,
+        'TM_SCOPE': 'source.js',
+        'TM_JAVASCRIPT_ESLINT_ESLINT': eslint,
+        'TM_JAVASCRIPT_ESLINT_CACHE_DIR': os.path.join(directory, 'cache'),
+        # keep the update check off the network
+        'TM_JAVASCRIPT_ESLINT_LATEST_URL': 'file://' + os.path.join(directory, 'latest.json')
+    })
+    return env, filename
+
+def check_quiet(python, env, filename):
+    """
+    Make sure main --quiet runs cleanly, so the right path is timed.
+    Returns what went wrong, or None.
+    """
+    with open(filename, 'r') as infile:
+        proc = subprocess.Popen(
+            [python, '-c', RUN_QUIET],
+            stdin=infile,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env
+        )
+        output, _ = proc.communicate()
+    output = output.decode('utf-8', 'replace').strip()
+    if proc.returncode != 0:
+        return 'exit status {0}\n{1}'.format(proc.returncode, output)
+    return output or None
+
+def quiet_ms(python, env, filename):
+    """ Wall-clock time of main --quiet, less interpreter startup, in ms. """
+    def timed(code):
+        with open(filename, 'r') as infile:
+            start = time.time()
+            subprocess.check_call([python, '-c', code], stdin=infile, env=env,
+                                  stdout=open(os.devnull, 'w'))
+            return time.time() - start
+    return (timed(RUN_QUIET) - timed('pass')) * 1000.0
+
+def report_only_imports(python):
+    """ Return the report-only modules that importing main pulls in. """
+    code = IMPORT_MAIN + '; import json; print(json.dumps([m for m in {0!r} if m in sys.modules]))'.format(
+        REPORT_ONLY_MODULES)
+    output = subprocess.check_output([python, '-c', code])
+    return json.loads(output.decode('utf-8'))
+
+def check_import(args):
+    """ Time import main against its budget. Returns True if it passes. """
+    try:
+        loaded = report_only_imports(args.python)
+        if supports_importtime(args.python):
+            method, measure = '-X importtime', importtime_ms
+        else:
+            method, measure = 'wall clock', wallclock_ms
+        elapsed = median([measure(args.python) for _ in range(args.runs)])
+    except (RuntimeError, subprocess.CalledProcessError) as err:
+        print('FAIL: import main failed: {0}'.format(err))
+        return False
+
+    passed = True
+    if loaded:
+        print('FAIL: quiet mode imports report-only modules: ' + ', '.join(loaded))
+        passed = False
+    print('import main: {0:.1f} ms ({1}, median of {2}), budget {3:.1f} ms'.format(
+        elapsed, method, args.runs, args.budget_ms))
+    if elapsed > args.budget_ms:
+        print('FAIL: quiet-mode startup is over budget')
+        passed = False
+    return passed
+
+def check_save(args):
+    """ Time main --quiet against its budget. Returns True if it passes. """
+    directory = tempfile.mkdtemp()
+    try:
+        env, filename = quiet_environment(directory)
+        # the first run fills the caches, as earlier saves would have
+        problem = check_quiet(args.python, env, filename)
+        if problem:
+            print('FAIL: main --quiet did not run cleanly: ' + problem)
+            return False
+        elapsed = median([quiet_ms(args.python, env, filename) for _ in range(args.runs)])
+    except subprocess.CalledProcessError as err:
+        print('FAIL: main --quiet failed: {0}'.format(err))
+        return False
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print('main --quiet: {0:.1f} ms (wall clock, median of {1}), budget {2:.1f} ms'.format(
+        elapsed, args.runs, args.quiet_budget_ms))
+    if elapsed > args.quiet_budget_ms:
+        print('FAIL: validate-on-save is over budget')
+        return False
+    return True
+
+def main():
+    """ Run the benchmark. """
+    parser = argparse.ArgumentParser(description='Check quiet-mode startup time.')
+    parser.add_argument('--python', default=sys.executable)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--quiet-budget-ms', type=float, default=DEFAULT_QUIET_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=15)
+    args = parser.parse_args()
+
+    # run both, so every failure is reported
+    import_passed = check_import(args)
+    save_passed = check_save(args)
+    sys.exit(0 if import_passed and save_passed else 1)
+
+
+if __name__ == '__main__':
+    main()